@@ -1,22 +1,47 @@
-from flask import Flask, request, jsonify
-import urllib
+from flask import Flask, request, jsonify, Response
+from flask.json.provider import DefaultJSONProvider
 import google.generativeai as genai
 import os
+import sys
 import requests
-from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import PIL
+from PIL import Image, ImageOps
 import io
 import json
 import logging
+import atexit
+import re
 from typing import Dict, Any, Optional
-import uuid
+import time
+import types
+import hashlib
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from contextlib import contextmanager
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.extras import NamedTupleCursor, execute_values, Json
+from psycopg2.pool import ThreadedConnectionPool
 import boto3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
+from cachetools import TTLCache, LRUCache
+
+try:
+    import orjson
+except ImportError:
+    # Fall back to Flask's stdlib json provider
+    orjson = None
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
 from urllib.parse import urlparse
 from dotenv import load_dotenv
-from typing import List, Tuple
+from typing import List, Sequence, Tuple
 
 # Configure logging
 logging.basicConfig(
@@ -28,6 +53,24 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 load_dotenv()
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson for request parsing and jsonify"""
+    def dumps(self, obj, **kwargs):
+        # Keep Flask's sorted keys; defer anything orjson can't encode (e.g. Decimal) to Flask's default
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+if orjson:
+    app.json = OrjsonProvider(app)
+
+# Pillow-SIMD releases carry a .postN suffix; plain Pillow still works, just with slower decode/resize
+if '.post' in PIL.__version__:
+    logger.info(f"Using Pillow-SIMD {PIL.__version__}")
+else:
+    logger.warning(f"Using stock Pillow {PIL.__version__}; install Pillow-SIMD for faster image processing")
+
 # Configuration with validation
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 WHATSAPP_TOKEN = os.getenv('WHATSAPP_TOKEN')
@@ -36,6 +79,27 @@ VERIFY_TOKEN = os.getenv('WEBHOOK_VERIFY_TOKEN')
 
 # Database Configuration
 DATABASE_URL = os.getenv('DATABASE_URL')
+# Schema DDL only runs on startup when explicitly requested; use `python bot.py migrate` otherwise
+RUN_MIGRATIONS = os.getenv('RUN_MIGRATIONS') == '1'
+# Each process keeps a pool of open connections instead of connecting per query
+DB_POOL_MIN_CONNECTIONS = int(os.getenv('DB_POOL_MIN_CONNECTIONS', 2))
+DB_POOL_MAX_CONNECTIONS = int(os.getenv('DB_POOL_MAX_CONNECTIONS', 20))
+# Hot lookups are PREPAREd once per pooled connection; turn off behind a transaction-mode pgbouncer
+DB_PREPARED_STATEMENTS = os.getenv('DB_PREPARED_STATEMENTS', '1') == '1'
+# Stale registration sessions are purged by a background thread at this interval
+SESSION_CLEANUP_INTERVAL_SECONDS = int(os.getenv('SESSION_CLEANUP_INTERVAL_SECONDS', 3600))
+SESSION_CLEANUP_BATCH_SIZE = 1000
+# Webhooks are acknowledged immediately and processed by this many background workers per process
+MESSAGE_WORKERS = int(os.getenv('MESSAGE_WORKERS', 8))
+MESSAGE_QUEUE_SIZE = int(os.getenv('MESSAGE_QUEUE_SIZE', 1000))
+# Per-process user row cache; other workers see a user's changes after at most the TTL
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 10000))
+USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', 30))
+# Nutrition analyses are buffered and inserted in batches at this size or interval, whichever comes first
+NUTRITION_BATCH_SIZE = int(os.getenv('NUTRITION_BATCH_SIZE', 100))
+NUTRITION_FLUSH_INTERVAL_SECONDS = float(os.getenv('NUTRITION_FLUSH_INTERVAL_SECONDS', 2))
+# Each process checks language_messages for changes this often and reloads its message table when they differ
+MESSAGES_REFRESH_SECONDS = float(os.getenv('MESSAGES_REFRESH_SECONDS', 60))
 
 # AWS S3 Configuration
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID')
@@ -68,51 +132,415 @@ if not ORIGIN_WEBSITE:
 
 # Configure Gemini API
 try:
-    genai.configure(api_key=GEMINI_API_KEY)
+    # REST goes through plain sockets, which gevent patches; the default gRPC transport's C core
+    # would block the whole worker for the length of every generate_content call
+    genai.configure(api_key=GEMINI_API_KEY, transport='rest')
     logger.info("Gemini API configured successfully")
 except Exception as e:
     logger.error(f"Failed to configure Gemini API: {e}")
     raise
 
+# Read NUMERIC/DECIMAL columns (the nutrition macros) as floats rather than Decimal objects;
+# nothing here needs exact decimal arithmetic and the values only end up in messages and JSON
+DEC2FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values,
+    'DEC2FLOAT',
+    lambda value, cursor: float(value) if value is not None else None
+)
+psycopg2.extensions.register_type(DEC2FLOAT)
+
 # Configure AWS S3
 try:
     s3_client = boto3.client(
         's3',
         aws_access_key_id=AWS_ACCESS_KEY_ID,
         aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-        region_name=AWS_REGION
+        region_name=AWS_REGION,
+        # Uploads run concurrently from the message and I/O workers, and a multipart upload adds its own
+        # transfer threads; keep enough warm connections that none are discarded under load
+        config=BotoConfig(
+            max_pool_connections=50,
+            tcp_keepalive=True,
+            retries={'max_attempts': 3, 'mode': 'adaptive'}
+        )
     )
     logger.info("AWS S3 configured successfully")
 except Exception as e:
     logger.error(f"Failed to configure AWS S3: {e}")
     raise
 
+# Images above the threshold (e.g. originals that could not be optimized) go up as concurrent parts
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_MULTIPART_THRESHOLD,
+    max_concurrency=10,
+    use_threads=True
+)
+
+# Shared HTTP session so WhatsApp Graph API calls reuse keep-alive connections.
+# Only idempotent requests are retried; a retried POST could send a message twice.
+HTTP_RETRY = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504], raise_on_status=False)
+http_session = requests.Session()
+http_session.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=HTTP_RETRY))
+
+# Worker threads for overlapping independent I/O within a request (e.g. S3 upload during analysis)
+io_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='io')
+
+MEDIA_CHUNK_SIZE = 64 * 1024
+
+# Messages inserted into an empty language_messages table on first start
+DEFAULT_MESSAGES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'default_messages.json')
+
+def read_streamed_content(response) -> bytes:
+    """Read a stream=True response body; join sizes the result once from the chunks it is given"""
+    return b''.join(response.iter_content(MEDIA_CHUNK_SIZE))
+
 def safe_json_serialize(obj):
     """Safely serialize objects for logging"""
     try:
         return json.dumps(obj, default=str)
     except (TypeError, ValueError) as e:
         return f"<Non-serializable object: {type(obj).__name__}>"
+
+# Phone photos are downscaled before upload and analysis; this is plenty for food identification
+MAX_IMAGE_DIMENSION = 1024
+IMAGE_JPEG_QUALITY = 85
+
+def optimize_image(image_bytes: bytes) -> bytes:
+    """Downscale and re-encode an image as JPEG, returning the original bytes on failure"""
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        
+        # Small, upright JPEGs are already fine; re-encoding would only cost CPU and quality
+        if (image.format == 'JPEG' and max(image.size) <= MAX_IMAGE_DIMENSION
+                and image.getexif().get(0x0112, 1) == 1):
+            return image_bytes
+        
+        # Let the JPEG decoder scale down by 1/2, 1/4 or 1/8 while decoding, before the exact resize
+        image.draft('RGB', (MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION), Image.LANCZOS)
+        
+        # JPEG has no alpha and convert('RGB') would turn transparent areas black; lay them on white
+        if image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info:
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+        optimized_bytes = output.getvalue()
+        
+        logger.debug("Optimized image from %s to %s bytes", len(image_bytes), len(optimized_bytes))
+        return optimized_bytes
+        
+    except Exception as e:
+        logger.warning(f"Could not optimize image, using original: {e}")
+        return image_bytes
+
+# Field coercion helpers for nutrition data, used when flattening Gemini output into DB columns
+_NUMERIC_RE = re.compile(r'[^\d.-]')
+
+def safe_truncate(value, max_length, field_name="unknown"):
+    if value is None:
+        return None
+    str_value = str(value)
+    if len(str_value) > max_length:
+        logger.warning(f"Truncating {field_name}: {len(str_value)} chars to {max_length}")
+        return str_value[:max_length]
+    return str_value
+
+def safe_numeric(value, default=None):
+    try:
+        if value is None:
+            return default
+        # Handle localized numbers - remove non-numeric chars except decimal
+        if isinstance(value, str):
+            clean_value = _NUMERIC_RE.sub('', value)
+            if not clean_value or clean_value == '-':
+                return default
+            value = clean_value
+        return float(value) if '.' in str(value) else int(value)
+    except (ValueError, TypeError):
+        logger.debug("safe_numeric failed on: %r (type: %s)", value, type(value).__name__)
+        return default
+
+def safe_boolean(value, default=None):
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.lower() in ('true', '1', 'yes', 'on')
+    return bool(value)
+
+def safe_array(value, default=None):
+    if value is None:
+        return default or []
+    if isinstance(value, list):
+        # Gemini almost always returns lists of strings; pass those through without copying
+        if all(isinstance(item, str) for item in value):
+            return value
+        return [str(item) for item in value if item is not None]
+    return [str(value)] if value else []
+
+def _truncate_to(max_length, field_name):
+    def truncate(value):
+        # Gemini's strings are nearly always within the column limit; only other values need coercing
+        if type(value) is str and len(value) <= max_length:
+            return value
+        return safe_truncate(value, max_length, field_name)
+    return truncate
+
+# Sections of Gemini's nutrition JSON that are not top-level keys, as paths from the root
+_NUTRITION_SECTION_PATHS = {
+    'dietary_compatibility': ('dietary_information', 'dietary_compatibility'),
+}
+
+# (column, section, key, converter) for every nutrition_analysis field taken from Gemini's JSON.
+# Fields of the same section are kept together so extraction looks each section up only once.
+_NUTRITION_FIELD_SPEC = (
+    ('dish_name', 'dish_identification', 'name', _truncate_to(200, 'dish_name')),
+    ('cuisine_type', 'dish_identification', 'cuisine_type', _truncate_to(100, 'cuisine_type')),
+    ('confidence_level', 'dish_identification', 'confidence_level', _truncate_to(50, 'confidence_level')),
+    ('dish_description', 'dish_identification', 'description', _truncate_to(2000, 'dish_description')),
+    ('estimated_weight_grams', 'serving_info', 'estimated_weight_grams', safe_numeric),
+    ('serving_description', 'serving_info', 'serving_description', _truncate_to(200, 'serving_description')),
+    ('calories', 'nutrition_facts', 'calories', safe_numeric),
+    ('protein_g', 'nutrition_facts', 'protein_g', safe_numeric),
+    ('carbohydrates_g', 'nutrition_facts', 'carbohydrates_g', safe_numeric),
+    ('fat_g', 'nutrition_facts', 'fat_g', safe_numeric),
+    ('fiber_g', 'nutrition_facts', 'fiber_g', safe_numeric),
+    ('sugar_g', 'nutrition_facts', 'sugar_g', safe_numeric),
+    ('sodium_mg', 'nutrition_facts', 'sodium_mg', safe_numeric),
+    ('saturated_fat_g', 'nutrition_facts', 'saturated_fat_g', safe_numeric),
+    ('key_vitamins', 'nutrition_facts', 'key_vitamins', safe_array),
+    ('key_minerals', 'nutrition_facts', 'key_minerals', safe_array),
+    ('health_score', 'health_analysis', 'health_score', safe_numeric),
+    ('health_grade', 'health_analysis', 'health_grade', _truncate_to(10, 'health_grade')),
+    ('nutritional_strengths', 'health_analysis', 'nutritional_strengths', safe_array),
+    ('areas_of_concern', 'health_analysis', 'areas_of_concern', safe_array),
+    ('overall_assessment', 'health_analysis', 'overall_assessment', _truncate_to(2000, 'overall_assessment')),
+    ('potential_allergens', 'dietary_information', 'potential_allergens', safe_array),
+    ('is_vegetarian', 'dietary_compatibility', 'vegetarian', safe_boolean),
+    ('is_vegan', 'dietary_compatibility', 'vegan', safe_boolean),
+    ('is_gluten_free', 'dietary_compatibility', 'gluten_free', safe_boolean),
+    ('is_dairy_free', 'dietary_compatibility', 'dairy_free', safe_boolean),
+    ('is_keto_friendly', 'dietary_compatibility', 'keto_friendly', safe_boolean),
+    ('is_low_sodium', 'dietary_compatibility', 'low_sodium', safe_boolean),
+    ('healthier_alternatives', 'improvement_suggestions', 'healthier_alternatives', safe_array),
+    ('portion_recommendations', 'improvement_suggestions', 'portion_recommendations', _truncate_to(1000, 'portion_recommendations')),
+    ('cooking_modifications', 'improvement_suggestions', 'cooking_modifications', safe_array),
+    ('nutritional_additions', 'improvement_suggestions', 'nutritional_additions', safe_array),
+    ('ingredients_identified', 'detailed_breakdown', 'ingredients_identified', safe_array),
+    ('cooking_method', 'detailed_breakdown', 'cooking_method', _truncate_to(100, 'cooking_method')),
+    ('meal_category', 'detailed_breakdown', 'meal_category', _truncate_to(50, 'meal_category')),
+)
+
+# The spec grouped as (section path, ((key, converter), ...), default values), in spec order.
+# Defaults are what each converter yields for a missing value, used as-is when a whole section is absent.
+_NUTRITION_SPEC_BY_SECTION = tuple(
+    (
+        _NUTRITION_SECTION_PATHS.get(section, (section,)),
+        tuple([(key, convert) for _, field_section, key, convert in _NUTRITION_FIELD_SPEC if field_section == section]),
+        tuple([convert(None) for _, field_section, _, convert in _NUTRITION_FIELD_SPEC if field_section == section])
+    )
+    for section in dict.fromkeys(section for _, section, _, _ in _NUTRITION_FIELD_SPEC)
+)
+_EMPTY_SECTION = types.MappingProxyType({})
+
+# nutrition_analysis columns in INSERT order; rows are bound positionally as tuples in this order.
+# The Gemini-derived columns follow _NUTRITION_FIELD_SPEC so extracted values can be appended as-is.
+_NUTRITION_BASE_COLUMNS = ('user_id', 'file_location', 'image_url', 'analysis_result', 'language')
+_NUTRITION_COLUMNS = _NUTRITION_BASE_COLUMNS + tuple(column for column, _, _, _ in _NUTRITION_FIELD_SPEC)
+_NUTRITION_FIELD_DEFAULTS = tuple(convert(None) for _, _, _, convert in _NUTRITION_FIELD_SPEC)
+
+# INSERT statements built once at import: one row of %s placeholders, or VALUES %s for execute_values
+_INSERT_NUTRITION_PREFIX = f"INSERT INTO nutrition_analysis ({', '.join(_NUTRITION_COLUMNS)}) VALUES "
+_INSERT_NUTRITION_SQL = _INSERT_NUTRITION_PREFIX + f"({', '.join(['%s'] * len(_NUTRITION_COLUMNS))})"
+_INSERT_NUTRITION_BATCH_SQL = _INSERT_NUTRITION_PREFIX + "%s"
+_COPY_NUTRITION_SQL = f"COPY nutrition_analysis ({', '.join(_NUTRITION_COLUMNS)}) FROM STDIN"
+# INTEGER columns; COPY rejects "12.5" where an INSERT parameter would have been rounded
+_COPY_INTEGER_POSITIONS = frozenset(
+    _NUTRITION_COLUMNS.index(column) for column in ('user_id', 'estimated_weight_grams', 'calories', 'health_score')
+)
+
+def _copy_escape(text: str) -> str:
+    """Escape a value for COPY's text format"""
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+def _copy_field(position: int, value) -> str:
+    """Render one nutrition_analysis value as a COPY text-format field"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, float) and position in _COPY_INTEGER_POSITIONS:
+        # Round half away from zero, as PostgreSQL does when assigning a numeric to an integer
+        value = int(Decimal(repr(value)).to_integral_value(rounding=ROUND_HALF_UP))
+    if isinstance(value, list):
+        # TEXT[] literal with every element quoted, then escaped again for COPY itself
+        value = '{' + ','.join(
+            '"' + str(item).replace('\\', '\\\\').replace('"', '\\"') + '"' for item in value
+        ) + '}'
+    return _copy_escape(str(value))
+
+# Columns a history query may select; callers pick a subset to avoid moving the large text fields
+NUTRITION_HISTORY_COLUMNS = (
+    ('id',) + _NUTRITION_BASE_COLUMNS[1:] + ('created_at',) + _NUTRITION_COLUMNS[len(_NUTRITION_BASE_COLUMNS):]
+)
+NUTRITION_HISTORY_SUMMARY_COLUMNS = (
+    'id', 'created_at', 'image_url', 'dish_name', 'calories', 'protein_g', 'carbohydrates_g', 'fat_g', 'health_grade'
+)
+_NUTRITION_HISTORY_ALLOWED_COLUMNS = frozenset(NUTRITION_HISTORY_COLUMNS)
+
+@lru_cache(maxsize=32)
+def _nutrition_history_sql(columns: tuple) -> str:
+    """Build the history SELECT for a column list; raises ValueError for columns outside NUTRITION_HISTORY_COLUMNS"""
+    unknown_columns = set(columns) - _NUTRITION_HISTORY_ALLOWED_COLUMNS
+    if unknown_columns:
+        raise ValueError(f"Unknown nutrition history columns: {sorted(unknown_columns)}")
+    return (
+        f"SELECT {', '.join(columns)} FROM nutrition_analysis "
+        "WHERE user_id = %s ORDER BY created_at DESC LIMIT %s"
+    )
+
+# Queries run on (nearly) every message, by name. With DB_PREPARED_STATEMENTS they are parsed and
+# planned once per pooled connection and afterwards only EXECUTEd.
+_PREPARED_STATEMENTS = {
+    # Only the columns the handlers read; the timestamps would just be decoded and cached
+    'get_user_by_phone': "SELECT user_id, phone_number, name, preferred_language, registration_status FROM users WHERE phone_number = %s",
+    # One round trip: the window total is taken over every day before LIMIT applies
+    'get_user_stats': """
+        SELECT (SUM(COUNT(*)) OVER ())::bigint as total_analyses,
+               DATE(created_at) as analysis_date, COUNT(*) as daily_count
+        FROM nutrition_analysis 
+        WHERE user_id = %s 
+        GROUP BY DATE(created_at)
+        ORDER BY analysis_date DESC
+        LIMIT 7
+    """,
+    'get_cached_analysis': "SELECT nutrition_data FROM analysis_cache WHERE image_hash = %s AND language = %s",
+}
+
+def _numbered_placeholders(sql: str) -> str:
+    """Turn psycopg2's %s placeholders into PREPARE's $1, $2, ..."""
+    parts = sql.split('%s')
+    return ''.join(part + (f"${i}" if i < len(parts) else '') for i, part in enumerate(parts, 1))
+
+_PREPARE_SQL = {name: f"PREPARE {name} AS {_numbered_placeholders(sql)}" for name, sql in _PREPARED_STATEMENTS.items()}
+_EXECUTE_PREPARED_SQL = {
+    name: f"EXECUTE {name} ({', '.join(['%s'] * sql.count('%s'))})"
+    for name, sql in _PREPARED_STATEMENTS.items()
+}
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """Connection that remembers which of _PREPARED_STATEMENTS have been prepared on it"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
     
 class DatabaseManager:
+    # Set once migrate_database_schema has run in this process
+    _schema_checked = False
+
     def __init__(self):
         self.database_url = DATABASE_URL
-        self.init_database()
+        # Short-lived cache of user rows keyed by phone number; every inbound message looks one up
+        self._user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+        self._user_cache_lock = threading.Lock()
+        # The pool is opened lazily in each process; connections must not be shared across a fork
+        self._pool = None
+        self._pool_pid = None
+        self._pool_slots = None
+        self._pool_lock = threading.Lock()
+        # Analysis rows are buffered off the reply path and inserted in batches by a flusher thread
+        self._nutrition_buffer = []
+        self._nutrition_buffer_lock = threading.Lock()
+        self._nutrition_flush_lock = threading.Lock()
+        self._nutrition_flush_event = threading.Event()
+        self._nutrition_flusher_pid = None
+        self._nutrition_flush_at_exit = False
+        if RUN_MIGRATIONS:
+            self.init_database()
         self.migrate_database_schema()
     
     def get_connection(self):
-        """Get database connection"""
+        """Open a dedicated database connection for schema changes; queries borrow from the pool via _cursor()"""
         try:
             return psycopg2.connect(self.database_url)
         except Exception as e:
             logger.error(f"Database connection failed: {e}")
             raise
     
+    def _get_pool(self) -> ThreadedConnectionPool:
+        """Get this process's connection pool, creating it on first use"""
+        pid = os.getpid()
+        if self._pool_pid != pid:
+            with self._pool_lock:
+                if self._pool_pid != pid:
+                    self._pool = ThreadedConnectionPool(
+                        DB_POOL_MIN_CONNECTIONS, DB_POOL_MAX_CONNECTIONS, dsn=self.database_url,
+                        connection_factory=PreparingConnection
+                    )
+                    # getconn() fails outright when the pool is exhausted; make callers wait instead
+                    self._pool_slots = threading.BoundedSemaphore(DB_POOL_MAX_CONNECTIONS)
+                    self._pool_pid = pid
+        return self._pool
+    
+    def put_connection(self, conn):
+        """Return a connection to the pool, ending any open transaction first"""
+        try:
+            if not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+        except Exception as e:
+            logger.warning(f"Discarding broken database connection: {e}")
+        self._get_pool().putconn(conn, close=bool(conn.closed))
+    
+    @contextmanager
+    def _cursor(self, cursor_factory=None):
+        """Borrow a pooled connection and cursor; the connection always goes back to the pool"""
+        pool = self._get_pool()
+        slots = self._pool_slots
+        slots.acquire()
+        try:
+            conn = pool.getconn()
+            # Pooled queries are single statements; autocommit skips the implicit BEGIN and the
+            # ROLLBACK on return, so a lookup costs one round trip instead of three
+            if not conn.autocommit:
+                conn.autocommit = True
+            try:
+                cursor = conn.cursor(cursor_factory=cursor_factory)
+                try:
+                    yield conn, cursor
+                finally:
+                    cursor.close()
+            finally:
+                self.put_connection(conn)
+        finally:
+            slots.release()
+    
+    def _execute_prepared(self, conn, cursor, name: str, params: tuple):
+        """Run one of _PREPARED_STATEMENTS on a pooled connection, preparing it there on first use"""
+        if not DB_PREPARED_STATEMENTS:
+            cursor.execute(_PREPARED_STATEMENTS[name], params)
+            return
+        if name not in conn.prepared_statements:
+            cursor.execute(_PREPARE_SQL[name])
+            conn.prepared_statements.add(name)
+        cursor.execute(_EXECUTE_PREPARED_SQL[name], params)
+    
     def init_database(self):
         """Initialize database tables with simplified schema (no address)"""
         try:
-            # Step 1: Create users table
+            # All DDL runs on one connection in a single transaction, so startup pays one
+            # connect and commit and a failed migration leaves no half-applied schema
             self._execute_sql_safely([
+                # Step 1: Create users table
                 """
                 CREATE TABLE IF NOT EXISTS users (
                     user_id SERIAL PRIMARY KEY,
@@ -123,11 +551,9 @@ class DatabaseManager:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
-                """
-            ])
+                """,
         
-            # Step 2: Create language_messages table
-            self._execute_sql_safely([
+                # Step 2: Create language_messages table
                 """
                 CREATE TABLE IF NOT EXISTS language_messages (
                     id SERIAL PRIMARY KEY,
@@ -138,80 +564,79 @@ class DatabaseManager:
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     UNIQUE(language_code, message_key)
                 );
-                """
-           ])
+                """,
         
-            # Step 3: Drop problematic columns safely
-            self._drop_columns_safely()
+                # Step 3: Drop problematic columns (no-op when they are already gone)
+                "ALTER TABLE IF EXISTS nutrition_analysis DROP COLUMN IF EXISTS phone_number;",
         
-            self._execute_sql_safely([
-            "DROP TABLE IF EXISTS nutrition_analysis CASCADE;",
-            """
-            CREATE TABLE nutrition_analysis (
-                id SERIAL PRIMARY KEY,
-                user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-                file_location TEXT NOT NULL,
-                analysis_result TEXT,
-                language TEXT NOT NULL DEFAULT 'en',  -- Changed from VARCHAR(100) to TEXT
+                # Step 4: Create nutrition_analysis table; existing rows are kept across deploys
+                """
+                CREATE TABLE IF NOT EXISTS nutrition_analysis (
+                    id SERIAL PRIMARY KEY,
+                    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+                    file_location TEXT NOT NULL,
+                    image_url TEXT,
+                    analysis_result TEXT,
+                    language TEXT NOT NULL DEFAULT 'en',  -- Changed from VARCHAR(100) to TEXT
                 
-                -- Dish identification
-                dish_name VARCHAR(20000),
-                cuisine_type VARCHAR(20000),
-                confidence_level VARCHAR(200),
-                dish_description TEXT,
+                    -- Dish identification
+                    dish_name VARCHAR(20000),
+                    cuisine_type VARCHAR(20000),
+                    confidence_level VARCHAR(200),
+                    dish_description TEXT,
                 
-                -- Serving information
-                estimated_weight_grams INTEGER,
-                serving_description VARCHAR(20000),
+                    -- Serving information
+                    estimated_weight_grams INTEGER,
+                    serving_description VARCHAR(20000),
                 
-                -- Nutrition facts (per serving)
-                calories INTEGER,
-                protein_g DECIMAL(8,2),
-                carbohydrates_g DECIMAL(8,2),
-                fat_g DECIMAL(8,2),
-                fiber_g DECIMAL(8,2),
-                sugar_g DECIMAL(8,2),
-                sodium_mg DECIMAL(8,2),
-                saturated_fat_g DECIMAL(8,2),
+                    -- Nutrition facts (per serving)
+                    calories INTEGER,
+                    protein_g DECIMAL(8,2),
+                    carbohydrates_g DECIMAL(8,2),
+                    fat_g DECIMAL(8,2),
+                    fiber_g DECIMAL(8,2),
+                    sugar_g DECIMAL(8,2),
+                    sodium_mg DECIMAL(8,2),
+                    saturated_fat_g DECIMAL(8,2),
                 
-                -- Vitamins and minerals (stored as arrays)
-                key_vitamins TEXT[],
-                key_minerals TEXT[],
+                    -- Vitamins and minerals (stored as arrays)
+                    key_vitamins TEXT[],
+                    key_minerals TEXT[],
                 
-                -- Health analysis
-                health_score INTEGER,
-                health_grade VARCHAR(5),
-                nutritional_strengths TEXT[],
-                areas_of_concern TEXT[],
-                overall_assessment TEXT,
+                    -- Health analysis
+                    health_score INTEGER,
+                    health_grade VARCHAR(5),
+                    nutritional_strengths TEXT[],
+                    areas_of_concern TEXT[],
+                    overall_assessment TEXT,
                 
-                -- Dietary information
-                potential_allergens TEXT[],
-                is_vegetarian BOOLEAN,
-                is_vegan BOOLEAN,
-                is_gluten_free BOOLEAN,
-                is_dairy_free BOOLEAN,
-                is_keto_friendly BOOLEAN,
-                is_low_sodium BOOLEAN,
+                    -- Dietary information
+                    potential_allergens TEXT[],
+                    is_vegetarian BOOLEAN,
+                    is_vegan BOOLEAN,
+                    is_gluten_free BOOLEAN,
+                    is_dairy_free BOOLEAN,
+                    is_keto_friendly BOOLEAN,
+                    is_low_sodium BOOLEAN,
                 
-                -- Improvement suggestions
-                healthier_alternatives TEXT[],
-                portion_recommendations TEXT,
-                cooking_modifications TEXT[],
-                nutritional_additions TEXT[],
+                    -- Improvement suggestions
+                    healthier_alternatives TEXT[],
+                    portion_recommendations TEXT,
+                    cooking_modifications TEXT[],
+                    nutritional_additions TEXT[],
                 
-                -- Additional details
-                ingredients_identified TEXT[],
-                cooking_method VARCHAR(2000),
-                meal_category VARCHAR(2000),
+                    -- Additional details
+                    ingredients_identified TEXT[],
+                    cooking_method VARCHAR(2000),
+                    meal_category VARCHAR(2000),
                 
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            );
-            """
-        ])
-
-            # Step 5: Create user_registration_sessions table
-            self._execute_sql_safely([
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                """,
+                # Columns added after the table was first created; new columns are appended here
+                "ALTER TABLE nutrition_analysis ADD COLUMN IF NOT EXISTS image_url TEXT;",
+        
+                # Step 5: Create user_registration_sessions table
                 """
                 CREATE TABLE IF NOT EXISTS user_registration_sessions (
                     id SERIAL PRIMARY KEY,
@@ -221,19 +646,22 @@ class DatabaseManager:
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 );
-                """
-           ])
+                """,
         
-            # Step 6: Create indexes
-            self._execute_sql_safely([
-                "CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone_number);",
-                "CREATE INDEX IF NOT EXISTS idx_nutrition_user_id ON nutrition_analysis(user_id);",
-                "CREATE INDEX IF NOT EXISTS idx_nutrition_calories ON nutrition_analysis(calories);",
-                "CREATE INDEX IF NOT EXISTS idx_nutrition_health_score ON nutrition_analysis(health_score);",
-                "CREATE INDEX IF NOT EXISTS idx_nutrition_meal_category ON nutrition_analysis(meal_category);",
-                "CREATE INDEX IF NOT EXISTS idx_sessions_phone ON user_registration_sessions(phone_number);",
-                "CREATE INDEX IF NOT EXISTS idx_messages_lang_key ON language_messages(language_code, message_key);"
-           ])
+                # Step 6: Create analysis_cache table (Gemini results keyed by image hash)
+                """
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    image_hash BYTEA NOT NULL,
+                    language VARCHAR(10) NOT NULL,
+                    nutrition_data JSONB NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (image_hash, language)
+                );
+                """,
+            ])
+
+            # Step 7: Create indexes, once the tables are committed
+            self._create_indexes_concurrently()
 
             logger.info("Database initialized successfully")
         
@@ -241,6 +669,38 @@ class DatabaseManager:
             logger.error(f"Database initialization error: {e}")
             raise
     
+    def _create_indexes_concurrently(self):
+        """Create indexes without blocking writes to tables that already hold data"""
+        index_statements = [
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_phone ON users(phone_number);",
+            # Per-user history and stats read by (user_id, created_at); these cover the old user_id index
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nutrition_user_created ON nutrition_analysis(user_id, created_at DESC);",
+            # Carrying created_at lets the daily stats query group straight off an index-only scan
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nutrition_user_day ON nutrition_analysis(user_id, (DATE(created_at))) INCLUDE (created_at);",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_nutrition_user_date;",
+            "DROP INDEX CONCURRENTLY IF EXISTS idx_nutrition_user_id;",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nutrition_calories ON nutrition_analysis(calories);",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nutrition_health_score ON nutrition_analysis(health_score);",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_nutrition_meal_category ON nutrition_analysis(meal_category);",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_phone ON user_registration_sessions(phone_number);",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_sessions_created ON user_registration_sessions(created_at);",
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_lang_key ON language_messages(language_code, message_key);"
+        ]
+        
+        conn = self.get_connection()
+        try:
+            # CONCURRENTLY cannot run inside a transaction block
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                for sql in index_statements:
+                    try:
+                        cursor.execute(sql)
+                    except Exception as e:
+                        # An interrupted concurrent build leaves an INVALID index; drop it and rerun migrate
+                        logger.warning(f"Could not apply index statement '{sql}': {e}")
+        finally:
+            conn.close()
+
     def _execute_sql_safely(self, sql_statements):
         """Execute SQL statements in a safe transaction"""
         conn = None
@@ -249,8 +709,8 @@ class DatabaseManager:
             conn = self.get_connection()
             cursor = conn.cursor()
         
-            for sql in sql_statements:
-                cursor.execute(sql)
+            # Send the batch as one multi-statement query: a single round trip, still one transaction
+            cursor.execute(";\n".join(sql_statements))
         
             conn.commit()
         
@@ -265,82 +725,75 @@ class DatabaseManager:
             if conn:
                 conn.close()
 
-    def _drop_columns_safely(self):
-        """Safely drop columns that might not exist"""
-        columns_to_drop = [
-            ("nutrition_analysis", "phone_number"),     
-        ]
-    
-        for table_name, column_name in columns_to_drop:
-            conn = None
-            cursor = None
-            try:
-                conn = self.get_connection()
-                cursor = conn.cursor()
-            
-                # Check if column exists first
-                cursor.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = %s AND column_name = %s
-                """, (table_name, column_name))
-            
-                if cursor.fetchone():
-                    cursor.execute(f"ALTER TABLE {table_name} DROP COLUMN {column_name};")
-                    conn.commit()
-                    logger.info(f"Dropped column {column_name} from {table_name}")
-            
-            except Exception as e:
-                logger.warning(f"Could not drop {column_name} from {table_name}: {e}")
-                if conn:
-                    conn.rollback()
-            finally:
-                if cursor:
-                    cursor.close()
-                if conn:
-                    conn.close()
-
     def get_language_message(self, language_code: str, message_key: str) -> Optional[str]:
         """Get language message from database"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self._cursor() as (conn, cursor):
+                cursor.execute(
+                    "SELECT message_text FROM language_messages WHERE language_code = %s AND message_key = %s",
+                    (language_code, message_key)
+                )
+                result = cursor.fetchone()
             
-            cursor.execute(
-                "SELECT message_text FROM language_messages WHERE language_code = %s AND message_key = %s",
-                (language_code, message_key)
-            )
-            result = cursor.fetchone()
+            return result[0] if result else None
             
-            cursor.close()
-            conn.close()
+        except Exception as e:
+            logger.error(f"Error getting language message: {e}")
+            return None
+    
+    def get_language_message_or_fallback(self, language_code: str, message_key: str, fallback_language: str = 'en') -> Optional[Tuple[str, str]]:
+        """Get a message in the language, else the fallback language, in one query; returns (language_code, text)"""
+        try:
+            with self._cursor() as (conn, cursor):
+                cursor.execute("""
+                    SELECT language_code, message_text FROM language_messages
+                    WHERE message_key = %s AND language_code IN (%s, %s)
+                    ORDER BY language_code = %s DESC
+                    LIMIT 1
+                """, (message_key, language_code, fallback_language, language_code))
+                result = cursor.fetchone()
             
-            return result[0] if result else None
+            return tuple(result) if result else None
             
         except Exception as e:
             logger.error(f"Error getting language message: {e}")
             return None
     
+    def get_language_messages_version(self) -> Optional[Tuple]:
+        """Get a cheap change stamp for language_messages: (row count, latest updated_at)"""
+        try:
+            with self._cursor() as (conn, cursor):
+                cursor.execute("SELECT COUNT(*), MAX(updated_at) FROM language_messages")
+                result = cursor.fetchone()
+            
+            return tuple(result) if result else None
+            
+        except Exception as e:
+            logger.error(f"Error getting language messages version: {e}")
+            return None
+    
     def insert_language_messages(self, messages_data: dict) -> bool:
         """Insert or update language messages in bulk"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            rows = [
+                (language_code, message_key, message_text)
+                for language_code, messages in messages_data.items()
+                for message_key, message_text in messages.items()
+            ]
+            
+            with self._cursor() as (conn, cursor):
+                # Single multi-row upsert instead of one round trip per message; a page covers
+                # the whole message set, so a full reload is one statement
+                execute_values(cursor, """
+                    INSERT INTO language_messages (language_code, message_key, message_text)
+                    VALUES %s
+                    ON CONFLICT (language_code, message_key)
+                    DO UPDATE SET 
+                        message_text = EXCLUDED.message_text,
+                        updated_at = CURRENT_TIMESTAMP
+                """, rows, template="(%s, %s, %s)", page_size=500)
+                conn.commit()
             
-            for language_code, messages in messages_data.items():
-                for message_key, message_text in messages.items():
-                    cursor.execute("""
-                        INSERT INTO language_messages (language_code, message_key, message_text)
-                        VALUES (%s, %s, %s)
-                        ON CONFLICT (language_code, message_key)
-                        DO UPDATE SET 
-                            message_text = EXCLUDED.message_text,
-                            updated_at = CURRENT_TIMESTAMP
-                    """, (language_code, message_key, message_text))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
             logger.info("Language messages inserted/updated successfully")
             return True
             
@@ -351,21 +804,15 @@ class DatabaseManager:
     def get_all_language_messages(self) -> dict:
         """Get all language messages from database"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT language_code, message_key, message_text FROM language_messages")
-            results = cursor.fetchall()
-            
-            cursor.close()
-            conn.close()
-            
-            # Structure the data
-            messages = {}
-            for language_code, message_key, message_text in results:
-                if language_code not in messages:
-                    messages[language_code] = {}
-                messages[language_code][message_key] = message_text
+            with self._cursor() as (conn, cursor):
+                cursor.execute("SELECT language_code, message_key, message_text FROM language_messages")
+                
+                # Structure the data straight off the cursor, without an intermediate row list.
+                # Codes and keys repeat across rows; interned, each is stored once.
+                intern = sys.intern
+                messages = {}
+                for language_code, message_key, message_text in cursor:
+                    messages.setdefault(intern(language_code), {})[intern(message_key)] = message_text
             
             return messages
             
@@ -375,20 +822,28 @@ class DatabaseManager:
 
     def get_user_by_phone(self, phone_number: str) -> Optional[Dict]:
         """Get user by phone number"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-            cursor.execute(
-                "SELECT * FROM users WHERE phone_number = %s",
-                (phone_number,)
-            )
-            user = cursor.fetchone()
+        with self._user_cache_lock:
+            cached_user = self._user_cache.get(phone_number)
+        if cached_user is not None:
+            return dict(cached_user)
         
-            cursor.close()
-            conn.close()
+        try:
+            # Plain tuple cursor; the row is turned into a dict once here rather than via RealDictRow
+            with self._cursor() as (conn, cursor):
+                self._execute_prepared(conn, cursor, 'get_user_by_phone', (phone_number,))
+                row = cursor.fetchone()
+                columns = [column.name for column in cursor.description]
         
-            return dict(user) if user else None
+            if not row:
+                return None
+            
+            user = dict(zip(columns, row))
+            # Interned so message table lookups by the user's language match by identity
+            if user['preferred_language']:
+                user['preferred_language'] = sys.intern(user['preferred_language'])
+            with self._user_cache_lock:
+                self._user_cache[phone_number] = user
+            return dict(user)
         
         except Exception as e:
             logger.error(f"Error getting user by phone: {e}")
@@ -397,34 +852,32 @@ class DatabaseManager:
     def create_user(self, phone_number: str, name: str, language: str) -> bool:
         """Create new user (simplified - no address)"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            with self._cursor() as (conn, cursor):
+                # Upsert the user and clear the registration session in one round trip
+                cursor.execute("""
+                    WITH cleared_session AS (
+                        DELETE FROM user_registration_sessions WHERE phone_number = %s
+                    )
+                    INSERT INTO users (phone_number, name, preferred_language, registration_status)
+                    VALUES (%s, %s, %s, 'completed')
+                    ON CONFLICT (phone_number) 
+                    DO UPDATE SET 
+                        name = EXCLUDED.name,
+                        preferred_language = EXCLUDED.preferred_language,
+                        registration_status = 'completed',
+                        updated_at = CURRENT_TIMESTAMP
+                    RETURNING user_id
+                """, (phone_number, phone_number, name, language))
+
+                result = cursor.fetchone()
+                conn.commit()
             
-            cursor.execute("""
-                INSERT INTO users (phone_number, name, preferred_language, registration_status)
-                VALUES (%s, %s, %s, 'completed')
-                ON CONFLICT (phone_number) 
-                DO UPDATE SET 
-                    name = EXCLUDED.name,
-                    preferred_language = EXCLUDED.preferred_language,
-                    registration_status = 'completed',
-                    updated_at = CURRENT_TIMESTAMP
-                RETURNING user_id
-            """, (phone_number, name, language))
-
-            result = cursor.fetchone()
             user_id = None
             if result:
                 user_id = result[0]
                 logger.info(f"User created/updated with user_id: {user_id}")
             
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            # Clean up registration session
-            self.delete_registration_session(phone_number)
-            
+            self.invalidate_user_cache(phone_number)
             return user_id
             
         except Exception as e:
@@ -437,7 +890,7 @@ class DatabaseManager:
             # First try to get existing user
             existing_user = self.get_user_by_phone(phone_number)
             if existing_user:
-                logger.info(f"Found existing user with user_id: {existing_user['user_id']}")
+                logger.debug("Found existing user with user_id: %s", existing_user['user_id'])
                 return existing_user['user_id']
         
             # If user doesn't exist and we have name, create new user
@@ -457,19 +910,15 @@ class DatabaseManager:
     def get_registration_session(self, phone_number: str) -> Optional[Dict]:
         """Get user registration session"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            cursor.execute(
-                "SELECT * FROM user_registration_sessions WHERE phone_number = %s",
-                (phone_number,)
-            )
-            session = cursor.fetchone()
+            with self._cursor() as (conn, cursor):
+                cursor.execute(
+                    "SELECT current_step, temp_data FROM user_registration_sessions WHERE phone_number = %s",
+                    (phone_number,)
+                )
+                row = cursor.fetchone()
+                columns = [column.name for column in cursor.description]
             
-            cursor.close()
-            conn.close()
-            
-            return dict(session) if session else None
+            return dict(zip(columns, row)) if row else None
             
         except Exception as e:
             logger.error(f"Error getting registration session: {e}")
@@ -478,28 +927,44 @@ class DatabaseManager:
     def update_registration_session(self, phone_number: str, step: str, temp_data: Dict) -> bool:
         """Update user registration session"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO user_registration_sessions (phone_number, current_step, temp_data)
-                VALUES (%s, %s, %s)
-                ON CONFLICT (phone_number)
-                DO UPDATE SET 
-                    current_step = EXCLUDED.current_step,
-                    temp_data = EXCLUDED.temp_data,
-                    updated_at = CURRENT_TIMESTAMP
-            """, (phone_number, step, json.dumps(temp_data)))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with self._cursor() as (conn, cursor):
+                cursor.execute("""
+                    INSERT INTO user_registration_sessions (phone_number, current_step, temp_data)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (phone_number)
+                    DO UPDATE SET 
+                        current_step = EXCLUDED.current_step,
+                        temp_data = EXCLUDED.temp_data,
+                        updated_at = CURRENT_TIMESTAMP
+                """, (phone_number, step, Json(temp_data)))
+                conn.commit()
             
             return True
             
         except Exception as e:
             logger.error(f"Error updating registration session: {e}")
             return False
+    def advance_registration_session(self, phone_number: str, step: str, temp_data_updates: Dict) -> bool:
+        """Move an existing registration session to the next step, merging into its temp data"""
+        try:
+            # One UPDATE instead of a read-modify-write; rowcount says whether a session existed
+            with self._cursor() as (conn, cursor):
+                cursor.execute("""
+                    UPDATE user_registration_sessions
+                    SET current_step = %s,
+                        temp_data = COALESCE(temp_data, '{}'::jsonb) || %s,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE phone_number = %s
+                """, (step, Json(temp_data_updates), phone_number))
+                advanced = cursor.rowcount > 0
+                conn.commit()
+            
+            return advanced
+            
+        except Exception as e:
+            logger.error(f"Error advancing registration session: {e}")
+            return False
+
     def complete_user_registration(self, phone_number: str) -> Optional[int]:
         """Complete user registration from session data and return user_id"""
         try:
@@ -530,61 +995,40 @@ class DatabaseManager:
             logger.error(f"Error completing user registration: {e}")
             return None
 
-    def get_next_user_id(self) -> int:
-        """Get the next available user_id (for reference only - PostgreSQL SERIAL handles this automatically)"""
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-        
-            cursor.execute("SELECT COALESCE(MAX(user_id), 0) + 1 FROM users")
-            next_id = cursor.fetchone()[0]
-        
-            cursor.close()
-            conn.close()
-        
-            return next_id
-        
-        except Exception as e:
-            logger.error(f"Error getting next user ID: {e}")
-            return 1
-    
     def update_user_language(self, phone_number: str, language: str) -> bool:
         """Update user's preferred language using phone number"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE users 
-                SET preferred_language = %s, updated_at = CURRENT_TIMESTAMP 
-                WHERE phone_number = %s
-            """, (language, phone_number))
-            
-            updated_rows = cursor.rowcount
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with self._cursor() as (conn, cursor):
+                cursor.execute("""
+                    UPDATE users 
+                    SET preferred_language = %s, updated_at = CURRENT_TIMESTAMP 
+                    WHERE phone_number = %s
+                """, (language, phone_number))
+                
+                updated_rows = cursor.rowcount
+                conn.commit()
             
+            self.invalidate_user_cache(phone_number)
             return updated_rows > 0
             
         except Exception as e:
             logger.error(f"Error updating user language: {e}")
             return False
     
+    def invalidate_user_cache(self, phone_number: str):
+        """Drop a cached user row after it has been written"""
+        with self._user_cache_lock:
+            self._user_cache.pop(phone_number, None)
+    
     def delete_registration_session(self, phone_number: str) -> bool:
         """Delete registration session"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute(
-                "DELETE FROM user_registration_sessions WHERE phone_number = %s",
-                (phone_number,)
-            )
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with self._cursor() as (conn, cursor):
+                cursor.execute(
+                    "DELETE FROM user_registration_sessions WHERE phone_number = %s",
+                    (phone_number,)
+                )
+                conn.commit()
             
             return True
             
@@ -592,251 +1036,192 @@ class DatabaseManager:
             logger.error(f"Error deleting registration session: {e}")
             return False
     
-    def save_nutrition_analysis(self, user_id: int, file_location: str, analysis_result: str, language: str = 'en', nutrition_data: dict = None) -> bool:
+    def save_nutrition_analysis(self, user_id: int, file_location: str, analysis_result: str, language: str = 'en', nutrition_data: dict = None, image_url: str = None) -> bool:
         """Save nutrition analysis to database - SIMPLIFIED VERSION"""
         try:
+            logger.debug("Starting nutrition analysis save for user_id: %s, language: %s, nutrition_data type: %s",
+                         user_id, language, type(nutrition_data).__name__)
 
-            print(f"🔍 SAVE_ANALYSIS CALLED:")
-            print(f"   - user_id: {user_id}")
-            print(f"   - language param: '{language}'")
-            print(f"   - nutrition_data type: {type(nutrition_data)}")
+            row = self._build_nutrition_row(user_id, file_location, analysis_result, language, nutrition_data, image_url)
             
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            logger.debug(f"Starting nutrition analysis save for user_id: {user_id}")
-
-            # Extract all fields using helper method
-            db_fields = self._extract_fields_for_db(nutrition_data, language)
-            
-            # RENDER DEBUG 6: Post-extraction check
-            print(f"🔍 DB_FIELDS AFTER EXTRACTION:")
-            print(f"   - language: '{db_fields.get('language')}'")
-            print(f"   - calories: {db_fields.get('calories')}")
-            print(f"   - dish_name: {db_fields.get('dish_name')}")
-            print(f"   - total keys: {len(db_fields)}")
-
-            # Add base fields
-            db_fields.update({
-                'user_id': user_id,
-                'file_location': str(file_location)[:500] if file_location else None,
-                'analysis_result': analysis_result
-            })
-
-            logger.debug("Final values prepared for insert:")
-            for k, v in db_fields.items():
-                logger.debug(f"  - {k}: {v}")
-            
-            # RENDER DEBUG 7: Pre-SQL check
-            print(f"🔍 FINAL DB_FIELDS (key samples):")
-            for key in ['user_id', 'language', 'calories', 'protein_g', 'dish_name']:
-                value = db_fields.get(key)
-                print(f"   - {key}: {value} (type: {type(value)})")
-            
-            # Execute the insert query
-            sql = """
-            INSERT INTO nutrition_analysis (
-                user_id, file_location, analysis_result, language,
-                dish_name, cuisine_type, confidence_level, dish_description,
-                estimated_weight_grams, serving_description,
-                calories, protein_g, carbohydrates_g, fat_g, fiber_g, sugar_g,
-                sodium_mg, saturated_fat_g, key_vitamins, key_minerals,
-                health_score, health_grade, nutritional_strengths, areas_of_concern, overall_assessment,
-                potential_allergens, is_vegetarian, is_vegan, is_gluten_free, is_dairy_free,
-                is_keto_friendly, is_low_sodium,
-                healthier_alternatives, portion_recommendations, cooking_modifications, nutritional_additions,
-                ingredients_identified, cooking_method, meal_category
-            ) VALUES (
-                %(user_id)s, %(file_location)s, %(analysis_result)s, %(language)s,
-                %(dish_name)s, %(cuisine_type)s, %(confidence_level)s, %(dish_description)s,
-                %(estimated_weight_grams)s, %(serving_description)s,
-                %(calories)s, %(protein_g)s, %(carbohydrates_g)s, %(fat_g)s, %(fiber_g)s, %(sugar_g)s,
-                %(sodium_mg)s, %(saturated_fat_g)s, %(key_vitamins)s, %(key_minerals)s,
-                %(health_score)s, %(health_grade)s, %(nutritional_strengths)s, %(areas_of_concern)s, %(overall_assessment)s,
-                %(potential_allergens)s, %(is_vegetarian)s, %(is_vegan)s, %(is_gluten_free)s, %(is_dairy_free)s,
-                %(is_keto_friendly)s, %(is_low_sodium)s,
-                %(healthier_alternatives)s, %(portion_recommendations)s, %(cooking_modifications)s, %(nutritional_additions)s,
-                %(ingredients_identified)s, %(cooking_method)s, %(meal_category)s
-            )
-            """
-            cursor.execute(sql, db_fields)
-
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with self._cursor() as (conn, cursor):
+                cursor.execute(_INSERT_NUTRITION_SQL, row)
+                conn.commit()
     
-            logger.info(f"Successfully saved nutrition analysis for user {user_id}")
+            logger.debug("Successfully saved nutrition analysis for user %s", user_id)
             return True
 
         except Exception as e:
             logger.error(f"Error saving nutrition analysis: {e}")
             logger.error(f"Error details - user_id: {user_id}, language: {language}")
             logger.exception("Full traceback:")
-            if 'conn' in locals() and conn:
-                conn.rollback()
             return False
-            
-    def _extract_fields_for_db(self, nutrition_data: dict, language: str) -> dict:
-        """Extract and flatten all DB-relevant fields from nutrition_data"""
-        
-        # RENDER DEBUG 3: Input check
-        print(f"🔍 EXTRACT_FIELDS INPUT:")
-        print(f"   - language param: '{language}'")
-        print(f"   - nutrition_data type: {type(nutrition_data)}")
-        print(f"   - is_food: {nutrition_data.get('is_food') if isinstance(nutrition_data, dict) else 'N/A'}")
-        # Helper functions
-        def safe_truncate(value, max_length, field_name="unknown"):
-            if value is None:
-                return None
-            str_value = str(value)
-            if len(str_value) > max_length:
-                logger.warning(f"Truncating {field_name}: {len(str_value)} chars to {max_length}")
-                return str_value[:max_length]
-            return str_value
 
-        def safe_numeric(value, default=None):
+    def _build_nutrition_row(self, user_id: int, file_location: str, analysis_result: str, language: str = 'en', nutrition_data: dict = None, image_url: str = None) -> tuple:
+        """Build the nutrition_analysis insert parameters for one analysis, in _NUTRITION_COLUMNS order"""
+        row = (
+            user_id,
+            str(file_location)[:500] if file_location else None,
+            image_url,
+            analysis_result,
+            language
+        ) + self._extract_field_values(nutrition_data)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Final values prepared for insert: %s", dict(zip(_NUTRITION_COLUMNS, row)))
+        return row
+
+    def bulk_store_analyses(self, analyses: List[Dict]) -> int:
+        """Insert many analyses in one batch; each dict takes the same keys as save_nutrition_analysis"""
+        rows = [self._build_nutrition_row(**analysis) for analysis in analyses]
+        return self._insert_nutrition_rows(rows)
+
+    def bulk_copy_analyses(self, analyses: List[Dict]) -> int:
+        """Load a large backfill of analyses with COPY; all rows are written or none are"""
+        if not analyses:
+            return 0
+        
+        try:
+            buffer = io.StringIO()
+            for analysis in analyses:
+                row = self._build_nutrition_row(**analysis)
+                buffer.write('\t'.join([_copy_field(position, value) for position, value in enumerate(row)]))
+                buffer.write('\n')
+            buffer.seek(0)
+            
+            with self._cursor() as (conn, cursor):
+                cursor.copy_expert(_COPY_NUTRITION_SQL, buffer)
+                conn.commit()
+            
+            logger.info(f"Copied {len(analyses)} nutrition analyses")
+            return len(analyses)
+            
+        except Exception as e:
+            logger.error(f"Error copying {len(analyses)} nutrition analyses: {e}")
+            return 0
+
+    def queue_nutrition_analysis(self, **kwargs):
+        """Buffer an analysis for the next batch insert; takes the same arguments as save_nutrition_analysis"""
+        row = self._build_nutrition_row(**kwargs)
+        pid = os.getpid()
+        with self._nutrition_buffer_lock:
+            if self._nutrition_flusher_pid != pid:
+                threading.Thread(target=self._nutrition_flush_loop, name='nutrition-flusher', daemon=True).start()
+                self._nutrition_flusher_pid = pid
+            # Registered on first use, not in __init__, so only a manager that actually buffers rows
+            # is pinned by atexit, and only once (a forked worker inherits the parent's registration)
+            if not self._nutrition_flush_at_exit:
+                atexit.register(self.flush_nutrition_analyses)
+                self._nutrition_flush_at_exit = True
+            self._nutrition_buffer.append(row)
+            buffer_full = len(self._nutrition_buffer) >= NUTRITION_BATCH_SIZE
+        if buffer_full:
+            self._nutrition_flush_event.set()
+
+    def _nutrition_flush_loop(self):
+        """Flush buffered analyses every interval, or early when the buffer fills up"""
+        while True:
+            self._nutrition_flush_event.wait(NUTRITION_FLUSH_INTERVAL_SECONDS)
+            self._nutrition_flush_event.clear()
             try:
-                if value is None:
-                    return default
-                # Handle localized numbers - remove non-numeric chars except decimal
-                import re
-                if isinstance(value, str):
-                    clean_value = re.sub(r'[^\d.-]', '', str(value))
-                    if not clean_value or clean_value == '-':
-                        return default
-                    value = clean_value
-                return float(value) if '.' in str(value) else int(value)
-            except (ValueError, TypeError):
-                print(f"⚠️ safe_numeric failed on: {value} (type: {type(value)})")
-                return default
+                self.flush_nutrition_analyses()
+            except Exception as e:
+                logger.error(f"Nutrition analysis flush error: {e}")
 
-        def safe_boolean(value, default=None):
-            if value is None:
-                return default
-            if isinstance(value, bool):
-                return value
-            if isinstance(value, str):
-                return value.lower() in ('true', '1', 'yes', 'on')
-            return bool(value)
-
-        def safe_array(value, default=None):
-            if value is None:
-                return default or []
-            if isinstance(value, list):
-                return [str(item) for item in value if item is not None]
-            return [str(value)] if value else []
-
-        # Initialize with defaults
-        fields = {
-            'language': language,  # Use the language parameter directly
-            'dish_name': None, 'cuisine_type': None, 'confidence_level': None, 'dish_description': None,
-            'estimated_weight_grams': None, 'serving_description': None,
-            'calories': None, 'protein_g': None, 'carbohydrates_g': None, 'fat_g': None,
-            'fiber_g': None, 'sugar_g': None, 'sodium_mg': None, 'saturated_fat_g': None,
-            'key_vitamins': [], 'key_minerals': [], 'health_score': None, 'health_grade': None,
-            'nutritional_strengths': [], 'areas_of_concern': [], 'overall_assessment': None,
-            'potential_allergens': [], 'is_vegetarian': None, 'is_vegan': None,
-            'is_gluten_free': None, 'is_dairy_free': None, 'is_keto_friendly': None, 'is_low_sodium': None,
-            'healthier_alternatives': [], 'portion_recommendations': None,
-            'cooking_modifications': [], 'nutritional_additions': [], 'ingredients_identified': [],
-            'cooking_method': None, 'meal_category': None
-        }
-        print(f"🔍 INITIAL LANGUAGE FIELD: '{fields['language']}'")
+    def flush_nutrition_analyses(self) -> int:
+        """Insert all buffered analyses and return how many were written"""
+        # Serialized so a caller draining the buffer also waits for a flush already in progress
+        with self._nutrition_flush_lock:
+            with self._nutrition_buffer_lock:
+                rows, self._nutrition_buffer = self._nutrition_buffer, []
+            return self._insert_nutrition_rows(rows)
 
+    def _insert_nutrition_rows(self, rows: List[tuple]) -> int:
+        """Insert prepared nutrition rows with multi-row INSERTs and return how many were written"""
+        if not rows:
+            return 0
+        
+        try:
+            with self._cursor() as (conn, cursor):
+                # execute_values sends one INSERT per 500-row page, and in autocommit each page would
+                # commit on its own; one transaction keeps the batch all-or-nothing, so the per-row
+                # retry below never re-inserts rows from a page that already landed
+                conn.autocommit = False
+                try:
+                    execute_values(cursor, _INSERT_NUTRITION_BATCH_SQL, rows, page_size=500)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            logger.debug("Saved %s nutrition analyses", len(rows))
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Batch save of {len(rows)} nutrition analyses failed, retrying one by one: {e}")
+        
+        # Retry individually so one bad row doesn't lose the rest of the batch
+        saved = 0
+        for row in rows:
+            try:
+                with self._cursor() as (conn, cursor):
+                    cursor.execute(_INSERT_NUTRITION_SQL, row)
+                    conn.commit()
+                saved += 1
+            except Exception as e:
+                logger.error(f"Error saving nutrition analysis for user {row[0]}: {e}")
+        return saved
+            
+    @staticmethod
+    def _extract_fields_for_db(nutrition_data: dict, language: str) -> dict:
+        """Extract and flatten all DB-relevant fields from nutrition_data"""
+        fields = dict(zip(_NUTRITION_COLUMNS[len(_NUTRITION_BASE_COLUMNS):], DatabaseManager._extract_field_values(nutrition_data)))
+        fields['language'] = language  # Use the language parameter directly
+        return fields
+
+    @staticmethod
+    def _extract_field_values(nutrition_data: dict) -> tuple:
+        """Extract the Gemini-derived column values from nutrition_data, in _NUTRITION_FIELD_SPEC order"""
         if not nutrition_data or not isinstance(nutrition_data, dict) or not nutrition_data.get('is_food', True):
-            print("🔍 RETURNING DEFAULT FIELDS (no food data)")
-            return fields
+            logger.debug("No food data to extract; using default fields")
+            return _NUTRITION_FIELD_DEFAULTS
 
         try:
-            # Extract dish identification
-            dish_info = nutrition_data.get('dish_identification', {})
-            fields['dish_name'] = safe_truncate(dish_info.get('name'), 200, 'dish_name')
-            fields['cuisine_type'] = safe_truncate(dish_info.get('cuisine_type'), 100, 'cuisine_type')
-            fields['confidence_level'] = safe_truncate(dish_info.get('confidence_level'), 50, 'confidence_level')
-            fields['dish_description'] = safe_truncate(dish_info.get('description'), 2000, 'dish_description')
-
-            # Extract serving info
-            serving_info = nutrition_data.get('serving_info', {})
-            fields['estimated_weight_grams'] = safe_numeric(serving_info.get('estimated_weight_grams'))
-            fields['serving_description'] = safe_truncate(serving_info.get('serving_description'), 200, 'serving_description')
-
-            # Extract nutrition facts
-            nutrition_facts = nutrition_data.get('nutrition_facts', {})
-            print(f"🔍 NUTRITION_FACTS RAW: {nutrition_facts}")
-            for key in ['calories', 'protein_g', 'carbohydrates_g', 'fat_g', 'fiber_g', 'sugar_g', 'sodium_mg', 'saturated_fat_g']:
-                fields[key] = safe_numeric(nutrition_facts.get(key))
-        
-            fields['key_vitamins'] = safe_array(nutrition_facts.get('key_vitamins'))
-            fields['key_minerals'] = safe_array(nutrition_facts.get('key_minerals'))
-
-            # Extract health analysis
-            health_analysis = nutrition_data.get('health_analysis', {})
-            fields['health_score'] = safe_numeric(health_analysis.get('health_score'))
-            fields['health_grade'] = safe_truncate(health_analysis.get('health_grade'), 10, 'health_grade')
-            fields['nutritional_strengths'] = safe_array(health_analysis.get('nutritional_strengths'))
-            fields['areas_of_concern'] = safe_array(health_analysis.get('areas_of_concern'))
-            fields['overall_assessment'] = safe_truncate(health_analysis.get('overall_assessment'), 2000, 'overall_assessment')
-
-            # Extract dietary information
-            dietary_info = nutrition_data.get('dietary_information', {})
-            fields['potential_allergens'] = safe_array(dietary_info.get('potential_allergens'))
-        
-            # Extract dietary compatibility flags
-            compatibility = dietary_info.get('dietary_compatibility', {})
-            for flag in ['vegetarian', 'vegan', 'gluten_free', 'dairy_free', 'keto_friendly', 'low_sodium']:
-                fields[f'is_{flag}'] = safe_boolean(compatibility.get(flag))
-
-            # Extract improvement suggestions
-            improvements = nutrition_data.get('improvement_suggestions', {})
-            fields['healthier_alternatives'] = safe_array(improvements.get('healthier_alternatives'))
-            fields['portion_recommendations'] = safe_truncate(improvements.get('portion_recommendations'), 1000, 'portion_recommendations')
-            fields['cooking_modifications'] = safe_array(improvements.get('cooking_modifications'))
-            fields['nutritional_additions'] = safe_array(improvements.get('nutritional_additions'))
-
-            # Extract detailed breakdown
-            breakdown = nutrition_data.get('detailed_breakdown', {})
-            fields['ingredients_identified'] = safe_array(breakdown.get('ingredients_identified'))
-            fields['cooking_method'] = safe_truncate(breakdown.get('cooking_method'), 100, 'cooking_method')
-            fields['meal_category'] = safe_truncate(breakdown.get('meal_category'), 50, 'meal_category')
+            logger.debug("Raw nutrition facts: %s", nutrition_data.get('nutrition_facts'))
+
+            values = []
+            append = values.append
+            for path, fields, defaults in _NUTRITION_SPEC_BY_SECTION:
+                section_data = nutrition_data
+                for part in path:
+                    section_data = section_data.get(part) or _EMPTY_SECTION
+                # Partial responses often leave whole sections out; skip their converters entirely
+                if not section_data:
+                    values.extend(defaults)
+                    continue
+                for key, convert in fields:
+                    append(convert(section_data.get(key)))
 
             logger.debug("Successfully extracted fields for DB")
-            return fields
+            return tuple(values)
 
         except Exception as e:
             logger.error(f"Error extracting fields for DB: {e}")
-            return fields
+            return _NUTRITION_FIELD_DEFAULTS
             
     def get_user_stats(self, user_id: int) -> Dict:
         """Get user analysis statistics using user_id"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            cursor.execute("""
-                SELECT COUNT(*) as total_analyses
-                FROM nutrition_analysis 
-                WHERE user_id = %s
-            """, (user_id,))
-            
-            total_result = cursor.fetchone()
-            
-            cursor.execute("""
-                SELECT DATE(created_at) as analysis_date, COUNT(*) as daily_count
-                FROM nutrition_analysis 
-                WHERE user_id = %s 
-                GROUP BY DATE(created_at)
-                ORDER BY analysis_date DESC
-                LIMIT 7
-            """, (user_id,))
-            
-            recent_stats = cursor.fetchall()
-            
-            cursor.close()
-            conn.close()
+            with self._cursor() as (conn, cursor):
+                self._execute_prepared(conn, cursor, 'get_user_stats', (user_id,))
+                
+                recent_stats = cursor.fetchall()
             
+            # Rows are (total_analyses, analysis_date, daily_count) tuples; no per-row dicts to build first
             return {
-                'total_analyses': total_result['total_analyses'] if total_result else 0,
-                'recent_analyses': [dict(row) for row in recent_stats] if recent_stats else []
+                'total_analyses': recent_stats[0][0] if recent_stats else 0,
+                'recent_analyses': [
+                    {'analysis_date': analysis_date, 'daily_count': daily_count}
+                    for _, analysis_date, daily_count in recent_stats
+                ]
             }
             
         except Exception as e:
@@ -845,19 +1230,27 @@ class DatabaseManager:
 
     def cleanup_old_registration_sessions(self):
         """Clean up old registration sessions (older than 24 hours)"""
+        deleted_count = 0
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                DELETE FROM user_registration_sessions 
-                WHERE created_at < NOW() - INTERVAL '24 hours'
-            """)
-            
-            deleted_count = cursor.rowcount
-            conn.commit()
-            cursor.close()
-            conn.close()
+            # Delete in bounded batches found through idx_sessions_created, each its own short
+            # statement, so a large backlog never holds locks or a pooled connection for long
+            while True:
+                with self._cursor() as (conn, cursor):
+                    cursor.execute("""
+                        DELETE FROM user_registration_sessions
+                        WHERE id IN (
+                            SELECT id FROM user_registration_sessions
+                            WHERE created_at < NOW() - INTERVAL '24 hours'
+                            LIMIT %s
+                        )
+                    """, (SESSION_CLEANUP_BATCH_SIZE,))
+                    
+                    batch_count = cursor.rowcount
+                    conn.commit()
+                
+                deleted_count += batch_count
+                if batch_count < SESSION_CLEANUP_BATCH_SIZE:
+                    break
             
             if deleted_count > 0:
                 logger.info(f"Cleaned up {deleted_count} old registration sessions")
@@ -867,41 +1260,46 @@ class DatabaseManager:
 
     def migrate_database_schema(self):
         """Migrate database schema to fix user_id issues"""
+        # The schema is shared by every instance and forked worker; check it once per process
+        if DatabaseManager._schema_checked:
+            return
+        DatabaseManager._schema_checked = True
+        
         conn = None
         cursor = None
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
     
-            # Check if users table exists
+            # One catalog round trip instead of three information_schema queries: does users exist,
+            # is user_id its primary key, and does nutrition_analysis have image_url yet
             cursor.execute("""
-                SELECT EXISTS (
-                    SELECT FROM information_schema.tables 
-                    WHERE table_name = 'users'
-                );
+                SELECT
+                    to_regclass('users') IS NOT NULL,
+                    EXISTS (
+                        SELECT 1 FROM pg_index i
+                        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+                        WHERE i.indrelid = to_regclass('users') AND i.indisprimary AND a.attname = 'user_id'
+                    ),
+                    EXISTS (
+                        SELECT 1 FROM pg_attribute
+                        WHERE attrelid = to_regclass('nutrition_analysis') AND attname = 'image_url' AND NOT attisdropped
+                    );
             """)
-        
-            table_exists = cursor.fetchone()[0]
+            table_exists, has_user_id_pk, has_image_url = cursor.fetchone()
         
             if not table_exists:
                 logger.info("Users table doesn't exist, will be created in init_database")
                 return
     
-            # Check if users table has user_id as primary key
-            cursor.execute("""
-                SELECT tc.constraint_name
-                FROM information_schema.table_constraints tc
-                JOIN information_schema.key_column_usage kcu
-                ON tc.constraint_name = kcu.constraint_name
-                WHERE tc.table_name = 'users' 
-                AND tc.constraint_type = 'PRIMARY KEY'
-                AND kcu.column_name = 'user_id';
-            """)
-            has_user_id_pk = cursor.fetchone() is not None
-    
             if not has_user_id_pk:
                 logger.info("Users table exists but needs migration - will be handled in init_database")
     
+            # Image URLs are stored at upload time instead of being rebuilt on every read
+            if not has_image_url:
+                cursor.execute("ALTER TABLE nutrition_analysis ADD COLUMN IF NOT EXISTS image_url TEXT;")
+                logger.info("Added image_url column to nutrition_analysis")
+    
             conn.commit()
     
         except Exception as e:
@@ -915,65 +1313,153 @@ class DatabaseManager:
             if conn:
                 conn.close()
      
-    def get_user_nutrition_history(self, user_id: int, limit: int = 10) -> List[Dict]:
-        """Get user's nutrition analysis history with all nutrient details"""
+    def get_user_nutrition_history(self, user_id: int, limit: int = 10, columns: Sequence[str] = NUTRITION_HISTORY_COLUMNS) -> List[Tuple]:
+        """Get user's nutrition analysis history as namedtuple rows (row.calories; row._asdict() for JSON)"""
+        sql = _nutrition_history_sql(tuple(columns))
+        
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
-            cursor.execute("""
-                SELECT 
-                    id, file_location, analysis_result, language, created_at,
-                    dish_name, cuisine_type, confidence_level, dish_description,
-                    estimated_weight_grams, serving_description,
-                    calories, protein_g, carbohydrates_g, fat_g, fiber_g, sugar_g, 
-                    sodium_mg, saturated_fat_g, key_vitamins, key_minerals,
-                    health_score, health_grade, nutritional_strengths, areas_of_concern, overall_assessment,
-                    potential_allergens, is_vegetarian, is_vegan, is_gluten_free, is_dairy_free, 
-                    is_keto_friendly, is_low_sodium,
-                    healthier_alternatives, portion_recommendations, cooking_modifications, nutritional_additions,
-                    ingredients_identified, cooking_method, meal_category
-                FROM nutrition_analysis 
-                WHERE user_id = %s 
-                ORDER BY created_at DESC 
-                LIMIT %s
-            """, (user_id, limit))
-    
-            history = cursor.fetchall()
+            # Rows are namedtuples; the class is built once per column list and not a dict per row
+            with self._cursor(NamedTupleCursor) as (conn, cursor):
+                cursor.execute(sql, (user_id, limit))
+                history = cursor.fetchall()
     
-            cursor.close()
-            conn.close()
-    
-            return [dict(row) for row in history] if history else []
+            return history
     
         except Exception as e:
             logger.error(f"Error getting nutrition history: {e}")
             return []
 
+    @contextmanager
+    def stream_user_nutrition_history(self, user_id: int, limit: int, columns: Sequence[str] = NUTRITION_HISTORY_COLUMNS):
+        """Iterate a long history from a server-side cursor instead of loading it all at once.
+
+        Use as `with db.stream_user_nutrition_history(user_id, limit) as rows:`. The pooled connection
+        is held until the block exits, and database errors propagate rather than cutting the rows short.
+        """
+        sql = _nutrition_history_sql(tuple(columns))
+        with self._cursor() as (conn, _):
+            # Named cursors only exist inside a transaction
+            conn.autocommit = False
+            try:
+                with conn.cursor(name=f"nutrition_history_{user_id}", cursor_factory=NamedTupleCursor) as cursor:
+                    cursor.itersize = 50
+                    cursor.execute(sql, (user_id, limit))
+                    yield cursor
+            finally:
+                # Read-only; ending the transaction also closes the server-side cursor
+                if not conn.closed:
+                    conn.rollback()
+                    conn.autocommit = True
+
+    def ping(self):
+        """Run a trivial query on a pooled connection; raises if the database is unreachable"""
+        with self._cursor() as (conn, cursor):
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+
+    def get_admin_stats_json(self) -> str:
+        """Get system-wide statistics as a JSON document rendered by Postgres"""
+        with self._cursor() as (conn, cursor):
+            # Build the whole response document in Postgres: one round trip, no per-row Python work.
+            # json_build_object keeps argument order, so keys are listed alphabetically at every
+            # level to match the sorted output jsonify produced
+            cursor.execute("""
+                SELECT json_build_object(
+                    'language_distribution', COALESCE((
+                        SELECT json_agg(
+                            json_build_object('count', languages.count, 'preferred_language', languages.preferred_language)
+                            ORDER BY languages.count DESC
+                        )
+                        FROM (
+                            SELECT preferred_language, COUNT(*) as count
+                            FROM users 
+                            WHERE registration_status = 'completed'
+                            GROUP BY preferred_language
+                        ) languages
+                    ), '[]'::json),
+                    'recent_activity', COALESCE((
+                        SELECT json_agg(
+                            json_build_object('count', activity.count, 'date', activity.date)
+                            ORDER BY activity.date DESC
+                        )
+                        FROM (
+                            SELECT DATE(created_at) as date, COUNT(*) as count 
+                            FROM nutrition_analysis 
+                            WHERE created_at >= NOW() - INTERVAL '7 days'
+                            GROUP BY DATE(created_at)
+                        ) activity
+                    ), '[]'::json),
+                    'timestamp', %s,
+                    'total_analyses', (SELECT COUNT(*) FROM nutrition_analysis),
+                    'total_users', (
+                        SELECT COUNT(*) FROM users WHERE registration_status = 'completed'
+                    )
+                )::text
+            """, (datetime.now().isoformat(),))
+            return cursor.fetchone()[0]
+
+    def get_cached_analysis(self, image_hash: bytes, language: str) -> Optional[Dict]:
+        """Get a previously stored analysis for the same image and language"""
+        try:
+            with self._cursor() as (conn, cursor):
+                self._execute_prepared(conn, cursor, 'get_cached_analysis', (image_hash, language))
+                result = cursor.fetchone()
+            
+            return result[0] if result else None
+            
+        except Exception as e:
+            logger.error(f"Error getting cached analysis: {e}")
+            return None
+
+    def save_cached_analysis(self, image_hash: bytes, language: str, nutrition_data: dict) -> bool:
+        """Store an analysis so identical images skip the Gemini call"""
+        try:
+            with self._cursor() as (conn, cursor):
+                cursor.execute("""
+                    INSERT INTO analysis_cache (image_hash, language, nutrition_data)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (image_hash, language) DO NOTHING
+                """, (image_hash, language, Json(nutrition_data)))
+                conn.commit()
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error saving cached analysis: {e}")
+            return False
+
 # Updated S3Manager class with simplified file paths
 class S3Manager:
     def __init__(self):
         self.s3_client = s3_client
         self.bucket_name = AWS_S3_BUCKET
         self.base_prefix = "https://{}.s3.{}.amazonaws.com".format(AWS_S3_BUCKET, AWS_REGION)
+        self._key_prefix = "nutrition_images/"
     
     def upload_image(self, image_bytes: bytes, user_id: int) -> tuple[Optional[str], Optional[str]]:
         """Upload image to S3 and return full URL and file location path"""
         try:
-            # Generate unique filename with simplified path
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{timestamp}_{uuid.uuid4().hex[:8]}.jpg"
-            file_location = f"/nutrition_images/{user_id}/{filename}"
-            
-            # Upload to S3 (remove leading slash for S3 key)
-            s3_key = file_location.lstrip('/')
-            
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=image_bytes,
-                ContentType='image/jpeg'
-            )
+            # Unique filename: nanosecond timestamp plus random suffix for uploads in the same instant
+            filename = f"{time.time_ns()}_{os.urandom(4).hex()}.jpg"
+            s3_key = f"{self._key_prefix}{user_id}/{filename}"
+            file_location = f"/{s3_key}"
+            
+            if len(image_bytes) > S3_MULTIPART_THRESHOLD:
+                self.s3_client.upload_fileobj(
+                    io.BytesIO(image_bytes),
+                    self.bucket_name,
+                    s3_key,
+                    ExtraArgs={'ContentType': 'image/jpeg'},
+                    Config=S3_TRANSFER_CONFIG
+                )
+            else:
+                # Optimized images are a few hundred KB; one PUT beats the transfer manager's overhead
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    Body=image_bytes,
+                    ContentType='image/jpeg'
+                )
             
             # Generate full URL
             image_url = f"{self.base_prefix}{file_location}"
@@ -1012,8 +1498,23 @@ class S3Manager:
             return None
 
 class LanguageManager:
+    # Parsed default_messages.json, loaded on first use and shared by every instance
+    _default_messages = None
+
     def __init__(self, db_manager):
         self.db_manager = db_manager
+        # Messages by language as loaded from the database, and the key -> {language: text} table
+        # built from them for lookups; both filled by initialize_messages
+        self.messages = {}
+        self.message_table = {}
+        # Memoized "<message>\n\n<language options>" prompts, keyed by (language, key)
+        self._options_prompt_cache = {}
+        # (language, key) pairs the database has no text for, so misses don't query on every message
+        self._missing_messages = set()
+        # Change stamp of the loaded messages and when to compare it with the database again; this is
+        # how changes made through another worker (or straight in the database) reach this process
+        self._messages_version = None
+        self._next_refresh_check = 0.0
         self.languages = {
             'en': 'English',
             'ta': 'Tamil (தமிழ்)',
@@ -1025,192 +1526,23 @@ class LanguageManager:
             'gu': 'Gujarati (ગુજરાતી)',
             'bn': 'Bengali (বাংলা)'
         }
+        # Rendered once; the language list does not change at runtime
+        self._language_options_text = self._build_language_options_text()
 
         self.initialize_messages()
 
     def initialize_messages(self):
         """Initialize messages from database, insert default if empty"""
         try:
+            self._messages_version = self.db_manager.get_language_messages_version()
+            self._next_refresh_check = time.monotonic() + MESSAGES_REFRESH_SECONDS
+
             # Check if messages exist in database
             existing_messages = self.db_manager.get_all_language_messages()
 
             if not existing_messages:
                 logger.info("No messages found in database, initializing with default messages")
-                # HERE IS WHERE YOU SHOULD PASTE YOUR MESSAGE CONTENT
-                # Replace this with your actual message data
-                default_messages = {
-                    "en": {
-                        "welcome": "👋 Hello! I'm your AI Nutrition Analyzer bot! Send me a photo of any food for detailed nutritional analysis.",
-                        "language_selection": "Please select your preferred language for nutrition analysis.",
-                        "ask_name": "Please enter your full name:",
-                        "registration_complete": "✅ Registration completed successfully! You can now send me food photos for nutrition analysis.",
-                        "analyzing": "🔍 Analyzing your food image... This may take a few moments.",
-                        "help": "Send me a food photo to get detailed nutrition analysis. Type 'language' to change your language preference.",
-                        "language_changed": "✅ Language updated successfully!",
-                        "language_change_failed": "❌ Failed to update language. Please try again.",
-                        "invalid_language": "❌ Invalid language selection. Please select from the available options.",
-                        "unsupported_message": "🤖 I can only process text messages and food images. Please send me a food photo for nutrition analysis!",
-                        "registration_failed": "❌ Registration failed. Please try again by typing 'start'.",
-                        "invalid_name": "📝 Please enter a valid name (at least 2 characters):",
-                        "image_processing_error": "❌ Sorry, I couldn't analyze your image. Please try again with a clearer photo of your food.",
-                        "followup_message": "📸 Send me another food photo for more analysis! Type 'help' for assistance.",
-                        "no_registration_session": "❌ No registration session found. Please type 'start' to begin.",
-                        "user_incomplete": "❌ User registration incomplete. Please type 'start' to re-register.",
-                        "unknown_command": "❓ I didn't understand that command. Type 'help' for assistance or send me a food photo for analysis.",
-                    },
-                    "ta": {
-                        "welcome": "👋 வணக்கம்! நான் உங்கள் AI ஊட்டச்சத்து பகுப்பாய்வு பாட்!\n\n📸 எந்த உணவின் புகைப்படத்தையும் அனுப்புங்கள், நான் வழங்குவேன்:\n• விரிவான ஊட்டச்சத்து தகவல்\n• கலோரி எண்ணிக்கை மற்றும் மேக்ரோக்கள்\n• ஆரோக்கிய பகுப்பாய்வு மற்றும் குறிப்புகள்\n• மேம்படுத்தும் பரிந்துரைகள்\n\nஉங்கள் உணவின் தெளிவான புகைப்படத்தை எடுத்து அனுப்புங்கள! 🍽️",
-                        "language_selection": "🌍 வணக்கம்! முதலில் உங்கள் விருப்பமான மொழியைத் தேர்ந்தெடுக்கவும்:\n\n• **English**\n• **Tamil** (தமிழ்)\n• **Telugu** (తెలుగు)\n• **Hindi** (हिन्दी)\n• **Kannada** (ಕನ್ನಡ)\n• **Malayalam** (മലയാളം)\n• **Marathi** (मराठी)\n• **Gujarati** (ગુજરાતી)\n• **Bengali** (বাংলা)\n\n💬 முழு மொழி பெயரைக் கொண்டு பதிலளியுங்கள் (எ.கா., 'Tamil', 'English', 'Hindi')",
-                        "ask_name": "சிறப்பு! உங்கள் முழுப் பெயரை உள்ளிடவும்:",
-                        "registration_complete": "✅ பதிவு வெற்றிகரமாக முடிந்தது! இப்போது நீங்கள் ஊட்டச்சத்து பகுப்பாய்விற்காக உணவு புகைப்படங்களை அனுப்பலாம்.",
-                        "analyzing": "🔍 உங்கள் உணவு படத்தை பகுப்பாய்வு செய்கிறேன்... இதற்கு சில நிமிடங்கள் ஆகலாம்.",
-                        "help": "🆘 **இந்த பாட்டை எப்படி பயன்படுத்துவது:**\n\n1. உங்கள் உணவின் தெளிவான புகைப்படத்தை எடுங்கள்\n2. படத்தை எனக்கு அனுப்புங்கள்\n3. பகுப்பாய்விற்காக காத்திருங்கள்\n4. விரிவான ஊட்டச்சத்து தகவலைப் பெறுங்கள்!\n\n**கிடைக்கும் கட்டளைகள்:**\n• 'help' என்று தட்டச்சு செய்யவும் - இந்த உதவி செய்தியைக் காட்டு\n• 'language' என்று தட்டச்சு செய்யவும் - உங்கள் விருப்பமான மொழியை மாற்றவும்\n• 'start' என்று தட்டச்சு செய்யவும் - பாட்டை மறுதொடக்கம் செய்யவும்\n\nதொடங்க எனக்கு உணவு புகைப்படம் ஒன்றை அனுப்புங்கள்! 📸",
-                        "language_changed": "✅ மொழி வெற்றிகரமாக புதுப்பிக்கப்பட்டது! இப்போது நீங்கள் ஊட்டச்சத்து பகுப்பாய்விற்காக உணவு புகைப்படங்களை அனுப்பலாம்.",
-                        "language_change_failed": "❌ மொழியை புதுப்பிக்க முடியவில்லை. மீண்டும் முயற்சிக்கவும்.",
-                        "invalid_language": "❌ தவறான மொழி தேர்வு. கிடைக்கும் விருப்பங்களில் இருந்து தேர்ந்தெடுக்கவும்.",
-                        "unsupported_message": "🤖 என்னால் செயல்படுத்த முடியும்:\n📝 உரை செய்திகள் (கட்டளைகள்)\n📸 உணவு படங்கள்\n\nஊட்டச்சத்து பகுப்பாய்விற்காக *உணவு புகைப்படம்* அனுப்பவும் அல்லது உதவிக்கு 'help' என்று தட்டச்சு செய்யவும்.",
-                        "registration_failed": "❌ பதிவு தோல்வியடைந்தது. 'start' என்று தட்டச்சு செய்து மீண்டும் முயற்சிக்கவும்.",
-                        "invalid_name": "📝 சரியான பெயரை உள்ளிடவும் (குறைந்தது 2 எழுத்துகள்):",
-                        "image_processing_error": "❌ மன்னிக்கவும், உங்கள் படத்தை பகுப்பாய்வு செய்ய முடியவில்லை. இதற்கான காரணங்கள்:\n\n• படம் போதுமான அளவு தெளிவாக இல்லை\n• படத்தில் உணவு தெரியவில்லை\n• தொழில்நுட்ப செயலாக்க பிழை\n\nஉங்கள் உணவின் தெளிவான புகைப்படத்துடன் மீண்டும் முயற்சிக்கவும்! 📸",
-                        "followup_message": "\n📸 மேலும் பகுப்பாய்விற்காக எனக்கு மற்றொரு உணவு புகைப்படத்தை அனுப்புங்கள்!\n💬 உதவிக்கு 'help' அல்லது மொழி மாற்ற 'language' என்று தட்டச்சு செய்யவும்.",
-                        "no_registration_session": "❌ பதிவு அமர்வு கிடைக்கவில்லை. தொடங்க 'start' என்று தட்டச்சு செய்யவும்.",
-                        "user_incomplete": "❌ பயனர் பதிவு முழுமையடையவில்லை. மீண்டும் பதிவு செய்ய 'start' என்று தட்டச்சு செய்யவும்.",
-                        "unknown_command": "❌ அந்த கட்டளையை என்னால் புரிந்து கொள்ள முடியவில்லை. கிடைக்கும் கட்டளைகளைப் பார்க்க 'help' என்று தட்டச்சு செய்யவும் அல்லது பகுப்பாய்விற்காக உணவு புகைப்படம் அனுப்பவும்.",
-                    },
-                    "te": {
-                        "welcome": "👋 నమస్కారం! నేను మీ AI పోషక విశ్లేషణ బాట్!\n\n📸 ఏదైనా ఆహారం యొక్క ఫోటోను పంపండి, నేను అందిస్తాను:\n• వివరణాత్మక పోషక సమాచారం\n• కేలరీ లెక్కింపు మరియు మాక్రోలు\n• ఆరోగ్య విశ్లేషణ మరియు చిట్కాలు\n• మెరుగుదల సూచనలు\n\nమీ భోజనం యొక్క స్పష్టమైన ఫోటో తీసి నాకు పంపండి! 🍽️",
-                        "language_selection": "🌍 స్వాగతం! దయచేసి ముందుగా మీ ఇష్టపడే భాషను ఎంచుకోండి:\n\n• **English**\n• **Tamil** (தமிழ்)\n• **Telugu** (తెలుగు)\n• **Hindi** (हिन्दी)\n• **Kannada** (ಕನ್ನಡ)\n• **Malayalam** (മലയാളം)\n• **Marathi** (मराठी)\n• **Gujarati** (ગુજરાતી)\n• **Bengali** (বাংলা)\n\n💬 పూర్తి భాష పేరుతో ప్రత్యుత్తరం ఇవ్వండి (ఉదా., 'Telugu', 'English', 'Hindi')",
-                        "ask_name": "గొప్పది! దయచేసి మీ పూర్తి పేరును నమోదు చేయండి:",
-                        "registration_complete": "✅ నమోదీకరణ విజయవంతంగా పూర్తయింది! ఇప్పుడు మీరు పోషక విశ్లేషణ కోసం ఆహార ఫోటోలను పంపవచ్చు.",
-                        "analyzing": "🔍 మీ ఆహార చిత్రాన్ని విశ్లేషిస్తున్నాను... దీనికి కొన్ని క్షణాలు పట్టవచ్చు.",
-                        "help": "🆘 **ఈ బాట్‌ను ఎలా ఉపయోగించాలి:**\n\n1. మీ ఆహారం యొక్క స్పష్టమైన ఫోటో తీసుకోండి\n2. చిత్రాన్ని నాకు పంపండి\n3. విశ్లేషణ కోసం వేచి ఉండండి\n4. వివరణాత్మక పోషక సమాచారాన్ని పొందండి!\n\n**అందుబాటులో ఉన్న కమాండ్‌లు:**\n• 'help' అని టైప్ చేయండి - ఈ సహాయ సందేశాన్ని చూపించు\n• 'language' అని టైప్ చేయండి - మీ ఇష్టపడే భాషను మార్చండి\n• 'start' అని టైప్ చేయండి - బాట్‌ను పునఃప్రారంభించండి\n\nప్రారంభించడానికి నాకు ఆహార ఫోటో పంపండి! 📸",
-                        "language_changed": "✅ భాష విజయవంతంగా నవీకరించబడింది! ఇప్పుడు మీరు పోషక విశ్లేషణ కోసం ఆహార ఫోటోలను పంపవచ్చు.",
-                        "language_change_failed": "❌ భాషను నవీకరించడంలో విఫలమైంది. దయచేసి మళ్లీ ప్రయత్నించండి.",
-                        "invalid_language": "❌ చెల్లని భాష ఎంపిక. దయచేసి అందుబాటులో ఉన్న ఎంపికల నుండి ఎంచుకోండి.",
-                        "unsupported_message": "🤖 నేను ప్రాసెస్ చేయగలను:\n📝 టెక్స్ట్ సందేశాలు (కమాండ్‌లు)\n📸 ఆహార చిత్రాలు\n\nపోషక విశ్లేషణ కోసం *ఆహార ఫోటో* పంపండి లేదా సహాయం కోసం 'help' అని టైప్ చేయండి.",
-                        "registration_failed": "❌ నమోదీకరణ విఫలమైంది. 'start' అని టైప్ చేసి మళ్లీ ప్రయత్నించండి.",
-                        "invalid_name": "📝 దయచేసి చెల్లుబాటు అయ్యే పేరును నమోదు చేయండి (కనీసం 2 అక్షరాలు):",
-                        "image_processing_error": "❌ క్షమించండి, మీ చిత్రాన్ని విశ్లేషించలేకపోయాను. దీనికి కారణాలు:\n\n• చిత్రం తగినంత స్పష్టంగా లేదు\n• చిత్రంలో ఆహారం కనిపించడం లేదు\n• సాంకేతిక ప్రాసెసింగ్ లోపం\n\nదయచేసి మీ ఆహారం యొక్క స్పష్టమైన ఫోటోతో మళ్లీ ప్రయత్నించండి! 📸",
-                        "followup_message": "\n📸 మరింత విశ్లేషణ కోసం నాకు మరొక ఆహార ఫోటో పంపండి!\n💬 సహాయం కోసం 'help' లేదా భాష మార్చడానికి 'language' అని టైప్ చేయండి.",
-                        "no_registration_session": "❌ నమోదీకరణ సెషన్ కనుగొనబడలేదు. ప్రారంభించడానికి 'start' అని టైప్ చేయండి.",
-                        "user_incomplete": "❌ వినియోగదారు నమోదీకరణ అసంపూర్ణం. మళ్లీ నమోదు చేయడానికి 'start' అని టైప్ చేయండి.",
-                        "unknown_command": "❌ ఆ కమాండ్ నాకు అర్థం కాలేదు. అందుబాటులో ఉన్న కమాండ్‌లను చూడటానికి 'help' అని టైప్ చేయండి లేదా విశ్లేషణ కోసం ఆహార ఫోటో పంపండి.",
-                    },
-                    "hi": {
-                        "welcome": "👋 नमस्ते! मैं आपका AI पोषण विश्लेषक बॉट हूँ!\n\n📸 मुझे किसी भी खाने की फोटो भेजें और मैं प्रदान करूंगा:\n• विस्तृत पोषण संबंधी जानकारी\n• कैलोरी गिनती और मैक्रोज़\n• स्वास्थ्य विश्लेषण और सुझाव\n• सुधार के सुझाव\n\nबस अपने भोजन की एक स्पष्ट तस्वीर लें और मुझे भेज दें! 🍽️",
-                        "language_selection": "🌍 स्वागत है! कृपया पहले अपनी पसंदीदा भाषा चुनें:\n\n• **English**\n• **Tamil** (தமிழ்)\n• **Telugu** (తెలుగు)\n• **Hindi** (हिन्दी)\n• **Kannada** (ಕನ್ನಡ)\n• **Malayalam** (മലയാളം)\n• **Marathi** (मराठी)\n• **Gujarati** (ગુજરાતી)\n• **Bengali** (বাংলা)\n\n💬 पूरे भाषा के नाम से जवाब दें (जैसे, 'Hindi', 'English', 'Tamil')",
-                        "ask_name": "बहुत बढ़िया! कृपया अपना पूरा नाम दर्ज करें:",
-                        "registration_complete": "✅ पंजीकरण सफलतापूर्वक पूरा हुआ! अब आप पोषण विश्लेषण के लिए खाने की फोटो भेज सकते हैं।",
-                        "analyzing": "🔍 आपकी खाने की तस्वीर का विश्लेषण कर रहा हूँ... इसमें कुछ समय लग सकता है।",
-                        "help": "🆘 **इस बॉट का उपयोग कैसे करें:**\n\n1. अपने खाने की स्पष्ट तस्वीर लें\n2. तस्वीर मुझे भेजें\n3. विश्लेषण का इंतजार करें\n4. विस्तृत पोषण जानकारी प्राप्त करें!\n\n**उपलब्ध कमांड:**\n• 'help' टाइप करें - यह सहायता संदेश दिखाएं\n• 'language' टाइप करें - अपनी पसंदीदा भाषा बदलें\n• 'start' टाइप करें - बॉट को पुनः आरंभ करें\n\nशुरू करने के लिए मुझे खाने की तस्वीर भेजें! 📸",
-                        "language_changed": "✅ भाषा सफलतापूर्वक अपडेट हो गई! अब आप पोषण विश्लेषण के लिए खाने की फोटो भेज सकते हैं।",
-                        "language_change_failed": "❌ भाषा अपडेट करने में विफल। कृपया पुनः प्रयास करें।",
-                        "invalid_language": "❌ अमान्य भाषा का चयन। कृपया उपलब्ध विकल्पों में से चुनें।",
-                        "unsupported_message": "🤖 मैं प्रोसेस कर सकता हूँ:\n📝 टेक्स्ट संदेश (कमांड)\n📸 खाने की तस्वीरें\n\nपोषण विश्लेषण के लिए *खाने की फोटो* भेजें या सहायता के लिए 'help' टाइप करें।",
-                        "registration_failed": "❌ पंजीकरण विफल हुआ। 'start' टाइप करके पुनः प्रयास करें।",
-                        "invalid_name": "📝 कृपया एक वैध नाम दर्ज करें (कम से कम 2 अक्षर):",
-                        "image_processing_error": "❌ खुशी है, मैं आपकी तस्वीर का विश्लेषण नहीं कर सका। इसके कारण हो सकते हैं:\n\n• तस्वीर पर्याप्त स्पष्ट नहीं है\n• तस्वीर में खाना दिखाई नहीं दे रहा\n• तकनीकी प्रोसेसिंग त्रुटि\n\nकृपया अपने खाने की स्पष्ट तस्वीर के साथ पुनः प्रयास करें! 📸",
-                        "followup_message": "\n📸 अधिक विश्लेषण के लिए मुझे खाने की और फोटो भेजें!\n💬 सहायता के लिए 'help' या भाषा बदलने के लिए 'language' टाइप करें।",
-                        "no_registration_session": "❌ पंजीकरण सत्र नहीं मिला। शुरू करने के लिए 'start' टाइप करें।",
-                        "user_incomplete": "❌ उपयोगकर्ता पंजीकरण अधूरा है। पुनः पंजीकरण के लिए 'start' टाइप करें।",
-                        "unknown_command": "❌ मुझे वह कमांड समझ नहीं आया। उपलब्ध कमांड देखने के लिए 'help' टाइप करें या विश्लेषण के लिए खाने की फोटो भेजें।",
-                    },
-                    "kn": {
-                        "welcome": "👋 ನಮಸ್ಕಾರ! ನಾನು ನಿಮ್ಮ AI ಪೋಷಣೆ ವಿಶ್ಲೇಷಕ ಬಾಟ್!\n\n📸 ಯಾವುದೇ ಆಹಾರದ ಫೋಟೋವನ್ನು ನನಗೆ ಕಳುಹಿಸಿ ಮತ್ತು ನಾನು ಒದಗಿಸುತ್ತೇನೆ:\n• ವಿವರವಾದ ಪೌಷ್ಟಿಕಾಂಶದ ಮಾಹಿತಿ\n• ಕ್ಯಾಲೋರಿ ಎಣಿಕೆ ಮತ್ತು ಮ್ಯಾಕ್ರೋಗಳು\n• ಆರೋಗ್ಯ ವಿಶ್ಲೇಷಣೆ ಮತ್ತು ಸಲಹೆಗಳು\n• ಸುಧಾರಣೆ ಸಲಹೆಗಳು\n\nನಿಮ್ಮ ಆಹಾರದ ಸ್ಪಷ್ಟ ಫೋಟೋವನ್ನು ತೆಗೆದು ನನಗೆ ಕಳುಹಿಸಿ! 🍽️",
-                        "language_selection": "🌍 ಸ್ವಾಗತ! ದಯವಿಟ್ಟು ಮೊದಲು ನಿಮ್ಮ ಆದ್ಯತೆಯ ಭಾಷೆಯನ್ನು ಆಯ್ಕೆಮಾಡಿ:\n\n• **English**\n• **Tamil** (தமிழ்)\n• **Telugu** (తెలుగు)\n• **Hindi** (हिन्दी)\n• **Kannada** (ಕನ್ನಡ)\n• **Malayalam** (മലയാളം)\n• **Marathi** (मराठी)\n• **Gujarati** (ગુજરાતી)\n• **Bengali** (বাংলা)\n\n💬 ಪೂರ್ಣ ಭಾಷೆಯ ಹೆಸರಿನೊಂದಿಗೆ ಉತ್ತರಿಸಿ (ಉದಾ., 'Kannada', 'English', 'Hindi')",
-                        "ask_name": "ಅದ್ಭುತ! ದಯವಿಟ್ಟು ನಿಮ್ಮ ಪೂರ್ಣ ಹೆಸರನ್ನು ನಮೂದಿಸಿ:",
-                        "registration_complete": "✅ ನೋಂದಣಿ ಯಶಸ್ವಿಯಾಗಿ ಪೂರ್ಣಗೊಂಡಿದೆ! ಈಗ ನೀವು ಪೋಷಣೆ ವಿಶ್ಲೇಷಣೆಗಾಗಿ ಆಹಾರ ಫೋಟೋಗಳನ್ನು ಕಳುಹಿಸಬಹುದು.",
-                        "analyzing": "🔍 ನಿಮ್ಮ ಆಹಾರ ಚಿತ್ರವನ್ನು ವಿಶ್ಲೇಷಿಸುತ್ತಿದ್ದೇನೆ... ಇದಕ್ಕೆ ಕೆಲವು ಕ್ಷಣಗಳು ಬೇಕಾಗಬಹುದು.",
-                        "help": "🆘 **ಈ ಬಾಟ್ ಅನ್ನು ಹೇಗೆ ಬಳಸುವುದು:**\n\n1. ನಿಮ್ಮ ಆಹಾರದ ಸ್ಪಷ್ಟ ಫೋಟೋವನ್ನು ತೆಗೆದುಕೊಳ್ಳಿ\n2. ಚಿತ್ರವನ್ನು ನನಗೆ ಕಳುಹಿಸಿ\n3. ವಿಶ್ಲೇಷಣೆಗಾಗಿ ಕಾಯಿರಿ\n4. ವಿವರವಾದ ಪೋಷಣೆ ಮಾಹಿತಿಯನ್ನು ಪಡೆಯಿರಿ!\n\n**ಲಭ್ಯವಿರುವ ಆಜ್ಞೆಗಳು:**\n• 'help' ಎಂದು ಟೈಪ್ ಮಾಡಿ - ಈ ಸಹಾಯ ಸಂದೇಶವನ್ನು ತೋರಿಸಿ\n• 'language' ಎಂದು ಟೈಪ್ ಮಾಡಿ - ನಿಮ್ಮ ಆದ್ಯತೆಯ ಭಾಷೆಯನ್ನು ಬದಲಾಯಿಸಿ\n• 'start' ಎಂದು ಟೈಪ್ ಮಾಡಿ - ಬಾಟ್ ಅನ್ನು ಮರುಪ್ರಾರಂಭಿಸಿ\n\nಪ್ರಾರಂಭಿಸಲು ನನಗೆ ಆಹಾರ ಫೋಟೋವನ್ನು ಕಳುಹಿಸಿ! 📸",
-                        "language_changed": "✅ ಭಾಷೆ ಯಶಸ್ವಿಯಾಗಿ ನವೀಕರಿಸಲಾಗಿದೆ! ಈಗ ನೀವು ಪೋಷಣೆ ವಿಶ್ಲೇಷಣೆಗಾಗಿ ಆಹಾರ ಫೋಟೋಗಳನ್ನು ಕಳುಹಿಸಬಹುದು.",
-                        "language_change_failed": "❌ ಭಾಷೆಯನ್ನು ನವೀಕರಿಸಲು ವಿಫಲವಾಗಿದೆ. ದಯವಿಟ್ಟು ಮತ್ತೆ ಪ್ರಯತ್ನಿಸಿ.",
-                        "invalid_language": "❌ ಅಮಾನ್ಯ ಭಾಷೆ ಆಯ್ಕೆ. ದಯವಿಟ್ಟು ಲಭ್ಯವಿರುವ ಆಯ್ಕೆಗಳಿಂದ ಆಯ್ಕೆಮಾಡಿ.",
-                        "unsupported_message": "🤖 ನಾನು ಪ್ರಕ್ರಿಯೆಗೊಳಿಸಬಲ್ಲುದು:\n📝 ಪಠ್ಯ ಸಂದೇಶಗಳು (ಆಜ್ಞೆಗಳು)\n📸 ಆಹಾರ ಚಿತ್ರಗಳು\n\nಪೋಷಣೆ ವಿಶ್ಲೇಷಣೆಗಾಗಿ *ಆಹಾರ ಫೋಟೋ* ಕಳುಹಿಸಿ ಅಥವಾ ಸಹಾಯಕ್ಕಾಗಿ 'help' ಎಂದು ಟೈಪ್ ಮಾಡಿ.",
-                        "registration_failed": "❌ ನೋಂದಣಿ ವಿಫಲವಾಗಿದೆ. 'start' ಎಂದು ಟೈಪ್ ಮಾಡಿ ಮತ್ತೆ ಪ್ರಯತ್ನಿಸಿ.",
-                        "invalid_name": "📝 ದಯವಿಟ್ಟು ಮಾನ್ಯವಾದ ಹೆಸರನ್ನು ನಮೂದಿಸಿ (ಕನಿಷ್ಠ 2 ಅಕ್ಷರಗಳು):",
-                        "image_processing_error": "❌ ಕ್ಷಮಿಸಿ, ನಿಮ್ಮ ಚಿತ್ರವನ್ನು ವಿಶ್ಲೇಷಿಸಲು ಸಾಧ್ಯವಾಗಲಿಲ್ಲ. ಇದಕ್ಕೆ ಕಾರಣಗಳು:\n\n• ಚಿತ್ರವು ಸಾಕಷ್ಟು ಸ್ಪಷ್ಟವಾಗಿಲ್ಲ\n• ಚಿತ್ರದಲ್ಲಿ ಆಹಾರ ಕಾಣಿಸುತ್ತಿಲ್ಲ\n• ತಾಂತ್ರಿಕ ಪ್ರಕ್ರಿಯೆ ದೋಷ\n\nದಯವಿಟ್ಟು ನಿಮ್ಮ ಆಹಾರದ ಸ್ಪಷ್ಟ ಫೋಟೋದೊಂದಿಗೆ ಮತ್ತೆ ಪ್ರಯತ್ನಿಸಿ! 📸",
-                        "followup_message": "\n📸 ಹೆಚ್ಚಿನ ವಿಶ್ಲೇಷಣೆಗಾಗಿ ನನಗೆ ಇನ್ನೊಂದು ಆಹಾರ ಫೋಟೋ ಕಳುಹಿಸಿ!\n💬 ಸಹಾಯಕ್ಕಾಗಿ 'help' ಅಥವಾ ಭಾಷೆ ಬದಲಾಯಿಸಲು 'language' ಎಂದು ಟೈಪ್ ಮಾಡಿ.",
-                        "no_registration_session": "❌ ನೋಂದಣಿ ಅಧಿವೇಶನ ಕಂಡುಬಂದಿಲ್ಲ. ಪ್ರಾರಂಭಿಸಲು 'start' ಎಂದು ಟೈಪ್ ಮಾಡಿ.",
-                        "user_incomplete": "❌ ಬಳಕೆದಾರ ನೋಂದಣಿ ಅಪೂರ್ಣವಾಗಿದೆ. ಮರುನೋಂದಣಿಗಾಗಿ 'start' ಎಂದು ಟೈಪ್ ಮಾಡಿ.",
-                        "unknown_command": "❌ ನನಗೆ ಆ ಆಜ್ಞೆ ಅರ್ಥವಾಗಲಿಲ್ಲ. ಲಭ್ಯವಿರುವ ಆಜ್ಞೆಗಳನ್ನು ನೋಡಲು 'help' ಎಂದು ಟೈಪ್ ಮಾಡಿ ಅಥವಾ ವಿಶ್ಲೇಷಣೆಗಾಗಿ ಆಹಾರ ಫೋಟೋ ಕಳುಹಿಸಿ.",
-                    },
-                    "ml": {
-                        "welcome": "👋 നമസ്കാരം! ഞാൻ നിങ്ങളുടെ AI പോഷകാഹാര വിശകലന ബോട്ട്!\n\n📸 ഏതെങ്കിലും ഭക്ഷണത്തിന്റെ ഫോട്ടോ എനിക്ക് അയച്ചാൽ ഞാൻ നൽകും:\n• വിശദമായ പോഷകാഹാര വിവരങ്ങൾ\n• കലോറി എണ്ണവും മാക്രോകളും\n• ആരോഗ്യ വിശകലനവും നുറുങ്ങുകളും\n• മെച്ചപ്പെടുത്തൽ നിർദ്ദേശങ്ങൾ\n\nനിങ്ങളുടെ ഭക്ഷണത്തിന്റെ വ്യക്തമായ ഫോട്ടോ എടുത്ത് എനിക്ക് അയക്കുക! 🍽️",
-                        "language_selection": "🌍 സ്വാഗതം! ദയവായി ആദ്യം നിങ്ങളുടെ ഇഷ്ട ഭാഷ തിരഞ്ഞെടുക്കുക:\n\n• **English**\n• **Tamil** (தமிழ்)\n• **Telugu** (తెలుగు)\n• **Hindi** (हिन्दी)\n• **Kannada** (ಕನ್ನಡ)\n• **Malayalam** (മലയാളം)\n• **Marathi** (मराठी)\n• **Gujarati** (ગુજરાતી)\n• **Bengali** (বাংলা)\n\n💬 പൂർണ്ണമായ ഭാഷാ നാമത്തോടെ മറുപടി നൽകുക (ഉദാ., 'Malayalam', 'English', 'Hindi')",
-                        "ask_name": "മികച്ചു! ദയവായി നിങ്ങളുടെ പൂർണ്ണ നാമം നൽകുക:",
-                        "registration_complete": "✅ രജിസ്ട്രേഷൻ വിജയകരമായി പൂർത്തിയായി! ഇപ്പോൾ നിങ്ങൾക്ക് പോഷകാഹാര വിശകലനത്തിനായി ഭക്ഷണ ഫോട്ടോകൾ അയക്കാം.",
-                        "analyzing": "🔍 നിങ്ങളുടെ ഭക്ഷണ ചിത്രം വിശകലനം ചെയ്യുന്നു... ഇതിന് കുറച്ച് നിമിഷങ്ങൾ എടുത്തേക്കാം.",
-                        "help": "🆘 **ഈ ബോട്ട് എങ്ങനെ ഉപയോഗിക്കാം:**\n\n1. നിങ്ങളുടെ ഭക്ഷണത്തിന്റെ വ്യക്തമായ ഫോട്ടോ എടുക്കുക\n2. ചിത്രം എനിക്ക് അയക്കുക\n3. വിശകലനത്തിനായി കാത്തിരിക്കുക\n4. വിശദമായ പോഷകാഹാര വിവരങ്ങൾ നേടുക!\n\n**ലഭ്യമായ കമാൻഡുകൾ:**\n• 'help' ടൈപ്പ് ചെയ്യുക - ഈ സഹായ സന്ദേശം കാണിക്കുക\n• 'language' ടൈപ്പ് ചെയ്യുക - നിങ്ങളുടെ ഇഷ്ട ഭാഷ മാറ്റുക\n• 'start' ടൈപ്പ് ചെയ്യുക - ബോട്ട് പുനരാരംഭിക്കുക\n\nആരംഭിക്കാൻ എനിക്ക് ഒരു ഭക്ഷണ ഫോട്ടോ അയക്കുക! 📸",
-                        "language_changed": "✅ ഭാഷ വിജയകരമായി അപ്‌ഡേറ്റ് ചെയ്തു! ഇപ്പോൾ നിങ്ങൾക്ക് പോഷകാഹാര വിശകലനത്തിനായി ഭക്ഷണ ഫോട്ടോകൾ അയക്കാം.",
-                        "language_change_failed": "❌ ഭാഷ അപ്‌ഡേറ്റ് ചെയ്യുന്നതിൽ പരാജയപ്പെട്ടു. ദയവായി വീണ്ടും ശ്രമിക്കുക.",
-                        "invalid_language": "❌ അസാധുവായ ഭാഷാ തിരഞ്ഞെടുപ്പ്. ദയവായി ലഭ്യമായ ഓപ്‌ഷനുകളിൽ നിന്ന് തിരഞ്ഞെടുക്കുക.",
-                        "unsupported_message": "🤖 എനിക്ക് പ്രോസസ്സ് ചെയ്യാൻ കഴിയും:\n📝 ടെക്‌സ്റ്റ് സന്ദേശങ്ങൾ (കമാൻഡുകൾ)\n📸 ഭക്ഷണ ചിത്രങ്ങൾ\n\nപോഷകാഹാര വിശകലനത്തിനായി *ഭക്ഷണ ഫോട്ടോ* അയക്കുക അല്ലെങ്കിൽ സഹായത്തിനായി 'help' ടൈപ്പ് ചെയ്യുക.",
-                        "registration_failed": "❌ രജിസ്ട്രേഷൻ പരാജയപ്പെട്ടു. 'start' ടൈപ്പ് ചെയ്ത് വീണ്ടും ശ്രമിക്കുക.",
-                        "invalid_name": "📝 ദയവായി സാധുവായ ഒരു നാമം നൽകുക (കുറഞ്ഞത് 2 അക്ഷരങ്ങൾ):",
-                        "image_processing_error": "❌ ക്ഷമിക്കുക, നിങ്ങളുടെ ചിത്രം വിശകലനം ചെയ്യാൻ എനിക്ക് കഴിഞ്ഞില്ല. ഇതിന് കാരണങ്ങൾ:\n\n• ചിത്രം വേണ്ടത്ര വ്യക്തമല്ല\n• ചിത്രത്തിൽ ഭക്ഷണം കാണാനില്ല\n• സാങ്കേതിക പ്രോസസ്സിംഗ് പിശക്\n\nദയവായി നിങ്ങളുടെ ഭക്ഷണത്തിന്റെ വ്യക്തമായ ഫോട്ടോയുമായി വീണ്ടും ശ്രമിക്കുക! 📸",
-                        "followup_message": "\n📸 കൂടുതൽ വിശകലനത്തിനായി എനിക്ക് മറ്റൊരു ഭക്ഷണ ഫോട്ടോ അയക്കുക!\n💬 സഹായത്തിനായി 'help' അല്ലെങ്കിൽ ഭാഷ മാറ്റാൻ 'language' ടൈപ്പ് ചെയ്യുക.",
-                        "no_registration_session": "❌ രജിസ്ട്രേഷൻ സെഷൻ കണ്ടെത്തിയില്ല. ആരംഭിക്കാൻ 'start' ടൈപ്പ് ചെയ്യുക.",
-                        "user_incomplete": "❌ ഉപയോക്താവിന്റെ രജിസ്ട്രേഷൻ അപൂർണ്ണമാണ്. വീണ്ടും രജിസ്റ്റർ ചെയ്യാൻ 'start' ടൈപ്പ് ചെയ്യുക.",
-                        "unknown_command": "❌ ആ കമാൻഡ് എനിക്ക് മനസ്സിലായില്ല. ലഭ്യമായ കമാൻഡുകൾ കാണാൻ 'help' ടൈപ്പ് ചെയ്യുക അല്ലെങ്കിൽ വിശകലനത്തിനായി ഭക്ഷണ ഫോട്ടോ അയക്കുക.",
-                    },
-                    "mr": {
-                        "welcome": "👋 नमस्कार! मी तुमचा AI पोषण विश्लेषक बॉट आहे!\n\n📸 मला कोणत्याही अन्नाचा फोटो पाठवा आणि मी प्रदान करीन:\n• तपशीलवार पोषण माहिती\n• कॅलरी मोजणी आणि मॅक्रोज\n• आरोग्य विश्लेषण आणि टिप्स\n• सुधारणा सूचना\n\nफक्त तुमच्या जेवणाचा स्पष्ट फोटो काढा आणि मला पाठवा! 🍽️",
-                        "language_selection": "🌍 स्वागत आहे! कृपया प्रथम तुमची आवडती भाषा निवडा:\n\n• **English**\n• **Tamil** (தமிழ்)\n• **Telugu** (తెలుగు)\n• **Hindi** (हिन्दी)\n• **Kannada** (ಕನ್ನಡ)\n• **Malayalam** (മലയാളം)\n• **Marathi** (मराठी)\n• **Gujarati** (ગુજરાતી)\n• **Bengali** (বাংলা)\n\n💬 पूर्ण भाषेच्या नावाने उत्तर द्या (उदा., 'Marathi', 'English', 'Hindi')",
-                        "ask_name": "उत्तम! कृपया तुमचे पूर्ण नाव प्रविष्ट करा:",
-                        "registration_complete": "✅ नोंदणी यशस्वीरित्या पूर्ण झाली! आता तुम्ही पोषण विश्लेषणासाठी अन्न फोटो पाठवू शकता.",
-                        "analyzing": "🔍 तुमच्या अन्न प्रतिमेचे विश्लेषण करत आहे... यास काही क्षण लागू शकतात.",
-                        "help": "🆘 **हा बॉट कसा वापरावा:**\n\n1. तुमच्या अन्नाचा स्पष्ट फोटो काढा\n2. प्रतिमा मला पाठवा\n3. विश्लेषणाची प्रतीक्षा करा\n4. तपशीलवार पोषण माहिती मिळवा!\n\n**उपलब्ध आदेश:**\n• 'help' टाइप करा - हा मदत संदेश दाखवा\n• 'language' टाइप करा - तुमची आवडती भाषा बदला\n• 'start' टाइप करा - बॉट पुन्हा सुरू करा\n\nसुरुवात करण्यासाठी मला अन्न फोटो पाठवा! 📸",
-                        "language_changed": "✅ भाषा यशस्वीरित्या अपडेट झाली! आता तुम्ही पोषण विश्लेषणासाठी अन्न फोटो पाठवू शकता.",
-                        "language_change_failed": "❌ भाषा अपडेट करण्यात अयशस्वी. कृपया पुन्हा प्रयत्न करा.",
-                        "invalid_language": "❌ अवैध भाषा निवड. कृपया उपलब्ध पर्यायांमधून निवडा.",
-                        "unsupported_message": "🤖 मी प्रक्रिया करू शकतो:\n📝 मजकूर संदेश (आदेश)\n📸 अन्न प्रतिमा\n\nपोषण विश्लेषणासाठी *अन्न फोटो* पाठवा किंवा मदतीसाठी 'help' टाइप करा.",
-                        "registration_failed": "❌ नोंदणी अयशस्वी झाली. 'start' टाइप करून पुन्हा प्रयत्न करा.",
-                        "invalid_name": "📝 कृपया वैध नाव प्रविष्ट करा (किमान 2 अक्षरे):",
-                        "image_processing_error": "❌ क्षमस्व, मी तुमची प्रतिमा विश्लेषित करू शकलो नाही. यासाठी कारणे:\n\n• प्रतिमा पुरेशी स्पष्ट नाही\n• प्रतिमेत अन्न दिसत नाही\n• तांत्रिक प्रक्रिया त्रुटी\n\nकृपया तुमच्या अन्नाच्या स्पष्ट फोटोसह पुन्हा प्रयत्न करा! 📸",
-                        "followup_message": "\n📸 अधिक विश्लेषणासाठी मला दुसरा अन्न फोटो पाठवा!\n💬 मदतीसाठी 'help' किंवा भाषा बदलण्यासाठी 'language' टाइप करा.",
-                        "no_registration_session": "❌ नोंदणी सत्र सापडले नाही. सुरुवात करण्यासाठी 'start' टाइप करा.",
-                        "user_incomplete": "❌ वापरकर्त्याची नोंदणी अपूर्ण आहे. पुन्हा नोंदणी करण्यासाठी 'start' टाइप करा.",
-                        "unknown_command": "❌ तो आदेश मला समजला नाही. उपलब्ध आदेश पाहण्यासाठी 'help' टाइप करा किंवा विश्लेषणासाठी अन्न फोटो पाठवा.",
-                    },
-                    "gu": {
-                        "welcome": "👋 નમસ્કાર! હું તમારો AI પોષણ વિશ્લેષણ બોટ છું!\n\n📸 મને કોઈપણ ખોરાકનો ફોટો મોકલો અને હું આપીશ:\n• વિસ્તૃત પોષણ માહિતી\n• કેલરી ગણતરી અને મેક્રોઝ\n• આરોગ્ય વિશ્લેષણ અને સુઝાવો\n• સુધારણા માર્ગદર્શન\n\nફક્ત તમારા ખોરાકનો સ્પષ્ટ ફોટો લો અને મને મોકલો! 🍽️",
-                        "language_selection": "🌍 સ્વાગત છે! કૃપા કરીને પહેલા તમારી પસંદીદા ભાષા પસંદ કરો:\n\n• **English**\n• **Tamil** (தமிழ்)\n• **Telugu** (తెలుగు)\n• **Hindi** (हिन्दी)\n• **Kannada** (ಕನ್ನಡ)\n• **Malayalam** (മലയാളം)\n• **Marathi** (मराठी)\n• **Gujarati** (ગુજરાતી)\n• **Bengali** (বাংলা)\n\n💬 સંપૂર્ણ ભાષાના નામ સાથે જવાબ આપો (દા.ત., 'Gujarati', 'English', 'Hindi')",
-                        "ask_name": "ઉત્તમ! કૃપા કરીને તમારું સંપૂર્ણ નામ દાખલ કરો:",
-                        "registration_complete": "✅ નોંધણી સફળતાપૂર્વક પૂર્ણ થઈ! હવે તમે પોષણ વિશ્લેષણ માટે ખોરાકના ફોટા મોકલી શકો છો.",
-                        "analyzing": "🔍 તમારી ખોરાકની છબીનું વિશ્લેષણ કરી રહ્યો છું... આમાં થોડી ક્ષણો લાગી શકે છે.",
-                        "help": "🆘 **આ બોટ કેવી રીતે ઉપયોગ કરવો:**\n\n1. તમારા ખોરાકનો સ્પષ્ટ ફોટો લો\n2. છબી મને મોકલો\n3. વિશ્લેષણની રાહ જુઓ\n4. વિસ્તૃત પોષણ માહિતી મેળવો!\n\n**ઉપલબ્ધ આદેશો:**\n• 'help' ટાઈપ કરો - આ સહાય સંદેશ બતાવો\n• 'language' ટાઈપ કરો - તમારી પસંદીદા ભાષા બદલો\n• 'start' ટાઈપ કરો - બોટ ફરીથી શરૂ કરો\n\nશરૂ કરવા માટે મને ખોરાકનો ફોટો મોકલો! 📸",
-                        "language_changed": "✅ ભાષા સફળતાપૂર્વક અપડેટ થઈ! હવે તમે પોષણ વિશ્લેષણ માટે ખોરાકના ફોટા મોકલી શકો છો.",
-                        "language_change_failed": "❌ ભાષા અપડેટ કરવામાં નિષ્ફળ. કૃપા કરીને ફરીથી પ્રયાસ કરો.",
-                        "invalid_language": "❌ અમાન્ય ભાષા પસંદગી. કૃપા કરીને ઉપલબ્ધ વિકલ્પોમાંથી પસંદ કરો.",
-                        "unsupported_message": "🤖 હું પ્રક્રિયા કરી શકું છું:\n📝 ટેક્સ્ટ સંદેશાઓ (આદેશો)\n📸 ખોરાકની છબીઓ\n\nપોષણ વિશ્લેષણ માટે *ખોરાકનો ફોટો* મોકલો અથવા સહાય માટે 'help' ટાઈપ કરો.",
-                        "registration_failed": "❌ નોંધણી નિષ્ફળ. 'start' ટાઈપ કરીને ફરીથી પ્રયાસ કરો.",
-                        "invalid_name": "📝 કૃપા કરીને માન્ય નામ દાખલ કરો (ઓછામાં ઓછા 2 અક્ષરો):",
-                        "image_processing_error": "❌ માફ કરશો, હું તમારી છબીનું વિશ્લેષણ કરી શક્યો નહીં. આના કારણો:\n\n• છબી પૂરતી સ્પષ્ટ નથી\n• છબીમાં ખોરાક દેખાતો નથી\n• તકનીકી પ્રક્રિયા ભૂલ\n\nકૃપા કરીને તમારા ખોરાકના સ્પષ્ટ ફોટો સાથે ફરીથી પ્રયાસ કરો! 📸",
-                        "followup_message": "\n📸 વધુ વિશ્લેષણ માટે મને બીજો ખોરાકનો ફોટો મોકલો!\n💬 સહાય માટે 'help' અથવા ભાષા બદલવા માટે 'language' ટાઈપ કરો.",
-                        "no_registration_session": "❌ નોંધણી સત્ર મળ્યું નહીં. શરૂ કરવા માટે 'start' ટાઈપ કરો.",
-                        "user_incomplete": "❌ વપરાશકર્તાની નોંધણી અધૂરી છે. ફરીથી નોંધણી કરવા માટે 'start' ટાઈપ કરો.",
-                        "unknown_command": "❌ તે આદેશ મને સમજાયો નહીં. ઉપલબ્ધ આદેશો જોવા માટે 'help' ટાઈપ કરો અથવા વિશ્લેષણ માટે ખોરાકનો ફોટો મોકલો.",
-                    },
-                    "bn": {
-                        "welcome": "👋 নমস্কার! আমি আপনার AI পুষ্টি বিশ্লেষণ বট!\n\n📸 আমাকে যেকোনো খাবারের ফটো পাঠান এবং আমি প্রদান করব:\n• বিস্তারিত পুষ্টি তথ্য\n• ক্যালোরি গণনা এবং ম্যাক্রো\n• স্বাস্থ্য বিশ্লেষণ এবং টিপস\n• উন্নতির সুপারিশ\n\nশুধু আপনার খাবারের স্পষ্ট ফটো তুলুন এবং আমাকে পাঠান! 🍽️",
-                        "language_selection": "🌍 স্বাগতম! অনুগ্রহ করে প্রথমে আপনার পছন্দের ভাষা নির্বাচন করুন:\n\n• **English**\n• **Tamil** (தமிழ்)\n• **Telugu** (తెలుగు)\n• **Hindi** (हिन्दी)\n• **Kannada** (ಕನ್ನಡ)\n• **Malayalam** (മലയാളം)\n• **Marathi** (मराठी)\n• **Gujarati** (ગુજરાતી)\n• **Bengali** (বাংলা)\n\n💬 সম্পূর্ণ ভাষার নাম দিয়ে উত্তর দিন (যেমন, 'Bengali', 'English', 'Hindi')",
-                        "ask_name": "চমৎকার! অনুগ্রহ করে আপনার সম্পূর্ণ নাম লিখুন:",
-                        "registration_complete": "✅ নিবন্ধন সফলভাবে সম্পন্ন হয়েছে! এখন আপনি পুষ্টি বিশ্লেষণের জন্য খাবারের ফটো পাঠাতে পারেন।",
-                        "analyzing": "🔍 আপনার খাবারের ছবি বিশ্লেষণ করছি... এতে কিছু মুহূর্ত লাগতে পারে।",
-                        "help": "🆘 **এই বট কীভাবে ব্যবহার করবেন:**\n\n1. আপনার খাবারের স্পষ্ট ফটো তুলুন\n2. ছবিটি আমাকে পাঠান\n3. বিশ্লেষণের জন্য অপেক্ষা করুন\n4. বিস্তারিত পুষ্টি তথ্য পান!\n\n**উপলব্ধ কমান্ড:**\n• 'help' টাইপ করুন - এই সাহায্য বার্তা দেখান\n• 'language' টাইপ করুন - আপনার পছন্দের ভাষা পরিবর্তন করুন\n• 'start' টাইপ করুন - বট পুনরায় শুরু করুন\n\nশুরু করতে আমাকে একটি খাবারের ফটো পাঠান! 📸",
-                        "language_changed": "✅ ভাষা সফলভাবে আপডেট হয়েছে! এখন আপনি পুষ্টি বিশ্লেষণের জন্য খাবারের ফটো পাঠাতে পারেন।",
-                        "language_change_failed": "❌ ভাষা আপডেট করতে ব্যর্থ। অনুগ্রহ করে আবার চেষ্টা করুন।",
-                        "invalid_language": "❌ অবৈধ ভাষা নির্বাচন। অনুগ্রহ করে উপলব্ধ বিকল্পগুলি থেকে নির্বাচন করুন।",
-                        "unsupported_message": "🤖 আমি প্রক্রিয়া করতে পারি:\n📝 টেক্সট বার্তা (কমান্ড)\n📸 খাবারের ছবি\n\nপুষ্টি বিশ্লেষণের জন্য *খাবারের ফটো* পাঠান বা সাহায্যের জন্য 'help' টাইপ করুন।",
-                        "registration_failed": "❌ নিবন্ধন ব্যর্থ হয়েছে। 'start' টাইপ করে আবার চেষ্টা করুন।",
-                        "invalid_name": "📝 অনুগ্রহ করে একটি বৈধ নাম লিখুন (কমপক্ষে ২টি অক্ষর):",
-                        "image_processing_error": "❌ দুঃখিত, আমি আপনার ছবি বিশ্লেষণ করতে পারিনি। এর কারণ:\n\n• ছবি যথেষ্ট স্পষ্ট নয়\n• ছবিতে খাবার দেখা যাচ্ছে না\n• প্রযুক্তিগত প্রক্রিয়াকরণ ত্রুটি\n\nঅনুগ্রহ করে আপনার খাবারের স্পষ্ট ফটো দিয়ে আবার চেষ্টা করুন! 📸",
-                        "followup_message": "\n📸 আরও বিশ্লেষণের জন্য আমাকে আরেকটি খাবারের ফটো পাঠান!\n💬 সাহায্যের জন্য 'help' বা ভাষা পরিবর্তনের জন্য 'language' টাইপ করুন।",
-                        "no_registration_session": "❌ নিবন্ধন সেশন পাওয়া যায়নি। শুরু করতে 'start' টাইপ করুন।",
-                        "user_incomplete": "❌ ব্যবহারকারীর নিবন্ধন অসম্পূর্ণ। পুনরায় নিবন্ধনের জন্য 'start' টাইপ করুন।",
-                        "unknown_command": "❌ সেই কমান্ড আমি বুঝতে পারিনি। উপলব্ধ কমান্ড দেখতে 'help' টাইপ করুন বা বিশ্লেষণের জন্য খাবারের ফটো পাঠান।",
-                    }
-                }
+                default_messages = self._load_default_messages()
 
                 # Insert default messages
                 success = self.db_manager.insert_language_messages(default_messages)
@@ -1218,77 +1550,155 @@ class LanguageManager:
                     logger.info("Default messages inserted successfully")
                 else:
                     logger.error("Failed to insert default messages")
+                self._build_message_table(default_messages)
             else:
                 logger.info(f"Messages loaded from database with languages: {list(existing_messages.keys())}")
+                self._build_message_table(existing_messages)
 
         except Exception as e:
             logger.error(f"Error initializing messages: {e}")
 
+    @classmethod
+    def _load_default_messages(cls) -> dict:
+        """Load the default messages used to seed an empty language_messages table"""
+        if cls._default_messages is None:
+            with open(DEFAULT_MESSAGES_PATH, 'rb') as f:
+                data = f.read()
+            messages = orjson.loads(data) if orjson else json.loads(data)
+            intern = sys.intern
+            cls._default_messages = {
+                intern(language_code): {intern(key): text for key, text in language_messages.items()}
+                for language_code, language_messages in messages.items()
+            }
+        return cls._default_messages
+
+    def _build_message_table(self, messages: dict):
+        """Index messages by key, then language, so the English fallback is a lookup in the same inner dict"""
+        self.messages = messages
+        table = {}
+        # Codes and keys read from the database are fresh strings; interned, they match the literal
+        # keys used by callers by identity, so lookups skip the string comparison
+        intern = sys.intern
+        for language_code, language_messages in messages.items():
+            language_code = intern(language_code)
+            for key, text in language_messages.items():
+                table.setdefault(intern(key), {})[language_code] = text
+        self.message_table = table
+        self._options_prompt_cache = {}
+        self._missing_messages = set()
+
+    def reload_messages(self) -> bool:
+        """Rebuild the message table from the database after messages were changed"""
+        # Read the stamp first: a change landing in between is picked up by the next check
+        version = self.db_manager.get_language_messages_version()
+        messages = self.db_manager.get_all_language_messages()
+        if not messages:
+            logger.error("No language messages found in database; keeping current messages")
+            return False
+        self._build_message_table(messages)
+        self._messages_version = version
+        logger.info(f"Reloaded language messages for languages: {list(messages.keys())}")
+        return True
+
+    def update_messages(self, messages_data: dict):
+        """Merge just-written messages into this process only; other workers reload within MESSAGES_REFRESH_SECONDS"""
+        merged = {language_code: dict(language_messages) for language_code, language_messages in self.messages.items()}
+        for language_code, language_messages in messages_data.items():
+            merged.setdefault(language_code, {}).update(language_messages)
+        self._build_message_table(merged)
+
+    def _refresh_if_changed(self):
+        """Reload the message table if language_messages changed since it was loaded, at most once per interval"""
+        now = time.monotonic()
+        if now < self._next_refresh_check:
+            return
+        self._next_refresh_check = now + MESSAGES_REFRESH_SECONDS
+        version = self.db_manager.get_language_messages_version()
+        if version is not None and version != self._messages_version:
+            logger.info("Language messages changed in the database; reloading")
+            self.reload_messages()
+
     def get_message(self, language: str, key: str) -> str:
-        """Get message in specified language from database"""
+        """Get message in specified language, falling back to database on a table miss"""
+        self._refresh_if_changed()
+        texts = self.message_table.get(key)
+        if texts:
+            message = texts.get(language) or texts.get('en')
+            if message:
+                return message
+        if (language, key) in self._missing_messages:
+            return f"Message not found: {key}"
+        
         try:
-            message = self.db_manager.get_language_message(language, key)
+            # The requested language and the English fallback come back from one query
+            result = self.db_manager.get_language_message_or_fallback(language, key, 'en')
 
-            if message:
+            if result:
+                message_language, message = result
+                if message_language != language:
+                    logger.warning(f"Using English fallback for language '{language}', key '{key}'")
+                # Stored under the language it is actually in; the English text answers the table
+                # lookup above, and a translation added later is picked up on the next reload
+                self.message_table.setdefault(key, {})[message_language] = message
                 return message
             else:
-                # Fallback to English
-                fallback_message = self.db_manager.get_language_message('en', key)
-                if fallback_message:
-                    logger.warning(f"Using English fallback for language '{language}', key '{key}'")
-                    return fallback_message
-                else:
-                    logger.error(f"Message not found for key '{key}' in any language")
-                    return f"Message not found: {key}"
+                logger.error(f"Message not found for key '{key}' in any language")
+                self._missing_messages.add((language, key))
+                return f"Message not found: {key}"
 
         except Exception as e:
             logger.error(f"Error getting message: {e}")
             return f"Error retrieving message: {key}"
 
+    def get_message_with_language_options(self, language: str, key: str) -> str:
+        """Get a message followed by the language options list, memoized per (language, key)"""
+        self._refresh_if_changed()
+        prompt = self._options_prompt_cache.get((language, key))
+        if prompt is None:
+            prompt = "\n\n".join((self.get_message(language, key), self._language_options_text))
+            # Don't pin "not found"/error text from a failed lookup
+            texts = self.message_table.get(key)
+            if texts and (language in texts or 'en' in texts):
+                self._options_prompt_cache[(language, key)] = prompt
+        return prompt
+
     def get_language_name(self, code: str) -> str:
         """Get language name by code"""
         return self.languages.get(code, 'English')
 
     def get_language_options_text(self) -> str:
         """Get formatted language options for user selection using full names"""
+        return self._language_options_text
+
+    def _build_language_options_text(self) -> str:
+        """Render the language options list from self.languages"""
         options = []
         for code, name in self.languages.items():
             options.append(f"• {name.split(' (')[0]}")  # Remove script part for cleaner display
 
-        return "🌍 Please select your preferred language:\n\n" + "\n".join(options) + "\n\n💬 Reply with the full language name (e.g., English, Tamil, Hindi)"
-
-class NutritionAnalyzer:
-    def __init__(self, language_manager):
-        self.language_manager = language_manager
-        
-        try:
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            logger.info("Nutrition analyzer initialized successfully")
-        except Exception as e:
-            logger.error(f"Failed to initialize nutrition analyzer: {e}")
-            raise
-
-    def analyze_image(self, image: Image.Image, language: str = 'en') -> tuple[str, dict]:
-        """Analyze food image and return nutrition information in specified language"""
-
-        # Language-specific instructions for Gemini
-        language_instructions = {
-            'en': "Please respond in English.",
-            'ta': "Please respond in Tamil language (தமிழ் மொழியில் பதிலளிக்கவும்). Write everything in Tamil script.",
-            'te': "Please respond in Telugu language (తెలుగు భాషలో సమాధానం ఇవ్వండి). Write everything in Telugu script.",
-            'hi': "Please respond in Hindi language (हिंदी भाषा में उत्तर दें). Write everything in Hindi script.",
-            'kn': "Please respond in Kannada language (ಕನ್ನಡ ಭಾಷೆಯಲ್ಲಿ ಉತ್ತರಿಸಿ). Write everything in Kannada script.",
-            'ml': "Please respond in Malayalam language (മലയാളം ഭാഷയിൽ ഉത്തരം നൽകുക). Write everything in Malayalam script.",
-            'mr': "Please respond in Marathi language (मराठी भाषेत उत्तर द्या). Write everything in Marathi script.",
-            'gu': "Please respond in Gujarati language (ગુજરાતી ભાષામાં જવાબ આપો). Write everything in Gujarati script.",
-            'bn': "Please respond in Bengali language (বাংলা ভাষায় উত্তর দিন). Write everything in Bengali script."
-        }
-
-        # Get language instruction
-        language_instruction = language_instructions.get(language, language_instructions['en'])
-
-        # Enhanced prompt for better JSON extraction
-        enhanced_prompt = f"""
+        return "\n\n".join((
+            "🌍 Please select your preferred language:",
+            "\n".join(options),
+            "💬 Reply with the full language name (e.g., English, Tamil, Hindi)"
+        ))
+
+# Gemini model and prompt are built once at import; only the language instruction varies per call
+GEMINI_MODEL_NAME = 'gemini-1.5-flash'
+
+# Language-specific instructions for Gemini
+LANGUAGE_INSTRUCTIONS = {
+    'en': "Please respond in English.",
+    'ta': "Please respond in Tamil language (தமிழ் மொழியில் பதிலளிக்கவும்). Write everything in Tamil script.",
+    'te': "Please respond in Telugu language (తెలుగు భాషలో సమాధానం ఇవ్వండి). Write everything in Telugu script.",
+    'hi': "Please respond in Hindi language (हिंदी भाषा में उत्तर दें). Write everything in Hindi script.",
+    'kn': "Please respond in Kannada language (ಕನ್ನಡ ಭಾಷೆಯಲ್ಲಿ ಉತ್ತರಿಸಿ). Write everything in Kannada script.",
+    'ml': "Please respond in Malayalam language (മലയാളം ഭാഷയിൽ ഉത്തരം നൽകുക). Write everything in Malayalam script.",
+    'mr': "Please respond in Marathi language (मराठी भाषेत उत्तर द्या). Write everything in Marathi script.",
+    'gu': "Please respond in Gujarati language (ગુજરાતી ભાષામાં જવાબ આપો). Write everything in Gujarati script.",
+    'bn': "Please respond in Bengali language (বাংলা ভাষায় উত্তর দিন). Write everything in Bengali script."
+}
+
+NUTRITION_PROMPT_TEMPLATE = """
         {language_instruction}
 
         FIRST, analyze this image carefully to determine if it contains food or a food dish.
@@ -1359,25 +1769,221 @@ class NutritionAnalyzer:
         CRITICAL: Respond with ONLY the JSON object. No additional text, explanations, or formatting.
         """
 
+# Fully rendered, read-only prompt per language, so analysis calls do no string formatting
+NUTRITION_PROMPTS = types.MappingProxyType({
+    code: NUTRITION_PROMPT_TEMPLATE.format(language_instruction=instruction)
+    for code, instruction in LANGUAGE_INSTRUCTIONS.items()
+})
+
+# Reply to a non-food image; {image_description} and {ai_message} come from Gemini
+NON_FOOD_MESSAGE_TEMPLATES = types.MappingProxyType({
+    'en': "🚫 This appears to be: {image_description}\n\n{ai_message}\n\nPlease send a clear photo of food for nutrition analysis! 📸🍽️",
+    'ta': "🚫 இது தோன்றுகிறது: {image_description}\n\n{ai_message}\n\nஊட்டச்சத்து பகுப்பாய்வுக்கு உணவின் தெளிவான புகைப்படத்தை அனுப்பவும்! 📸🍽️",
+    'te': "🚫 ఇది కనిపిస్తోంది: {image_description}\n\n{ai_message}\n\nపోషకాహార విశ్లేషణ కోసం ఆహారం యొక్క స్పష్టమైన ఫోటోను పంపండి! 📸🍽️",
+    'hi': "🚫 यह दिखाई दे रहा है: {image_description}\n\n{ai_message}\n\nपोषण विश्लेषण के लिए भोजन की स्पष्ट तस्वीर भेजें! 📸🍽️",
+    'kn': "🚫 ಇದು ಕಾಣಿಸುತ್ತದೆ: {image_description}\n\n{ai_message}\n\nಪೋಷಣೆ ವಿಶ್ಲೇಷಣೆಗಾಗಿ ಆಹಾರದ ಸ್ಪಷ್ಟ ಫೋಟೋವನ್ನು ಕಳುಹಿಸಿ! 📸🍽️",
+    'ml': "🚫 ഇത് കാണുന്നത്: {image_description}\n\n{ai_message}\n\nപോഷകാഹാര വിശകലനത്തിനായി ഭക്ഷണത്തിന്റെ വ്യക്തമായ ഫോട്ടോ അയയ്ക്കുക! 📸🍽️",
+    'mr': "🚫 हे दिसत आहे: {image_description}\n\n{ai_message}\n\nपोषण विश्लेषणासाठी अन्नाचा स्पष्ट फोटो पाठवा! 📸🍽️",
+    'gu': "🚫 આ દેખાય છે: {image_description}\n\n{ai_message}\n\nપોષણ વિશ્લેષણ માટે ખોરાકનો સ્પષ્ટ ફોટો મોકલો! 📸🍽️",
+    'bn': "🚫 এটি দেখা যাচ্ছে: {image_description}\n\n{ai_message}\n\nপুষ্টি বিশ্লেষণের জন্য খাবারের স্পষ্ট ছবি পাঠান! 📸🍽️"
+})
+
+# Non-food reply when the image description could not be used
+NON_FOOD_FALLBACK_MESSAGES = types.MappingProxyType({
+    'en': "🚫 This doesn't appear to be a food image. Please send a clear photo of food for nutrition analysis!",
+    'ta': "🚫 இது உணவு படம் அல்ல. ஊட்டச்சத்து பகுப்பாய்வுக்கு உணவின் தெளிவான புகைப்படத்தை அனுப்பவும்!",
+    'te': "🚫 ఇది ఆహార చిత్రం కాదు. పోషకాహార విశ్లేషణ కోసం ఆహారం యొక్క స్పష్టమైన ఫోటోను పంపండి!",
+    'hi': "🚫 यह भोजन की तस्वीर नहीं लगती। कृपया पोषण विश्लेషण के लिए भोजन की स्पष्ट तस्वీर भेजें!",
+    'kn': "🚫 ಇದು ಆಹಾರ ಚಿತ್ರವಲ್ಲ. ಪೋಷಣೆ ವಿಶ್ಲೇಷಣೆಗಾಗಿ ಆಹಾರದ ಸ್ಪಷ್ಟ ಫೋಟೋವನ್ನು ಕಳುಹಿಸಿ!",
+    'ml': "🚫 ഇത് ഭക്ഷണ ചിത്രമല്ല. പോഷകാഹാര വിശകലനത്തിനായി ഭക്ഷണത്തിന്റെ വ്യക്തമായ ഫോട്ടോ അയയ്ക്കുക!",
+    'mr': "🚫 हा अन्नाचा फोटो नाही. पोषण विश्लेषणासाठी अन्नाचा स्पष्ट फोटो पाठवा!",
+    'gu': "🚫 આ ખોરાકનો ફોટો નથી. પોષણ વિશ્લેષણ માટે ખોરાકનો સ્પષ્ટ ફોટો મોકલો!",
+    'bn': "🚫 এটি খাবারের ছবি নয়। পুষ্টি বিশ্লেষণের জন্য খাবারের স্পষ্ট ছবি পাঠান!"
+})
+
+# Short analysis summary used when the detailed message cannot be built
+ANALYSIS_FALLBACK_TEMPLATES = types.MappingProxyType({
+    'en': "🍽️ Analyzed: {dish_name}\n🔥 Calories: {calories}\n💪 Health Score: {health_score}/10\n\n📸 Send another food photo for more analysis!",
+    'ta': "🍽️ பகுப்பாய்வு: {dish_name}\n🔥 கலோரிகள்: {calories}\n💪 ஆரோக்கிய மதிப்பெண்: {health_score}/10\n\n📸 மேலும் பகுப்பாய்வுக்கு மற்றொரு உணவு புகைப்படம் அனுப்பவும்!",
+    'hi': "🍽️ विश्लेषण: {dish_name}\n🔥 कैलोरी: {calories}\n💪 स्वास्थ्य स्कोर: {health_score}/10\n\n📸 अधिक विश्लेषण के लिए दूसरी खाना फोटो भेजें!"
+})
+
+# Reply when Gemini's JSON could not be parsed
+JSON_ERROR_MESSAGES = types.MappingProxyType({
+    'en': "🤖 I analyzed your food but had trouble formatting the response. Please try again with another photo.",
+    'ta': "🤖 உங்கள் உணவை பகுப்பாய்வு செய்தேன் ஆனால் பதிலை வடிவமைப்பதில் சிக்கல் ஏற்பட்டது. மற்றொரு புகைப்படத்துடன் மீண்டும் முயற்சிக்கவும்.",
+    'hi': "🤖 मैंने आपके भोजन का विश्लेषण किया लेकिन उत्तर को प्रारूपित करने में परेशानी हुई। कृपया दूसरी तस्वीर के साथ पुनः प्रयास करें।"
+})
+
+# Reply when analysis fails outright
+ANALYSIS_ERROR_MESSAGES = types.MappingProxyType({
+    'en': "❌ Sorry, I couldn't analyze this image. Please try again with a clearer photo of your food.",
+    'ta': "❌ மன்னிக்கவும், இந்த படத்தை பகுப்பாய்வு செய்ய முடியவில்லை. உங்கள் உணவின் தெளிவான புகைப்படத்துடன் மீண்டும் முயற்சிக்கவும்.",
+    'te': "❌ క్షమించండి, ఈ చిత్రాన్ని విశ్లేషించలేకపోయాను. దయచేసి మీ ఆహారం యొక్క స్పష్టమైన ఫోటోతో మళ్లీ ప్రయత్నించండి.",
+    'hi': "❌ क्षमा करें, मैं इस छवि का विश्लेषण नहीं कर सका। कृपया अपने भोजन की स्पष्ट तस्वीर के साथ पुनः प्रयास करें।",
+    'kn': "❌ ಕ್ಷಮಿಸಿ, ನಾನು ಈ ಚಿತ್ರವನ್ನು ವಿಶ್ಲೇಷಿಸಲು ಸಾಧ್ಯವಾಗಲಿಲ್ಲ. ದಯವಿಟ್ಟು ನಿಮ್ಮ ಆಹಾರದ ಸ್ಪಷ್ಟ ಫೋಟೋದೊಂದಿಗೆ ಮತ್ತೆ ಪ್ರಯತ್ನಿಸಿ.",
+    'ml': "❌ ക്ഷമിക്കണം, ഈ ചിത്രം വിശകലനം ചെയ്യാൻ എനിക്ക് കഴിഞ്ഞില്ല. ദയവായി നിങ്ങളുടെ ഭക്ഷണത്തിന്റെ വ്യക്തമായ ഫോട്ടോ ഉപയോഗിച്ച് വീണ്ടും ശ്രമിക്കുക.",
+    'mr': "❌ माफ करा, मी या प्रतिमेचे विश्लेषण करू शकलो नाही. कृपया आपल्या अन्नाच्या स्पष्ट फोटोसह पुन्हा प्रयत्न करा.",
+    'gu': "❌ માફ કરશો, હું આ છબીનું વિશ્લેષણ કરી શક્યો નથી. કૃપા કરીને તમારા ખોરાકના સ્પષ્ટ ફોટો સાથે ફરીથી પ્રયાસ કરો.",
+    'bn': "❌ দুঃখিত, আমি এই ছবিটি বিশ্লেষণ করতে পারিনি। দয়া করে আপনার খাবারের স্পষ্ট ফটো দিয়ে আবার চেষ্টা করুন।"
+})
+
+
+# Sections of the detailed analysis reply, rendered with str.format_map and separated by a blank line
+_USER_MESSAGE_SECTIONS = (
+    "🍽️ DISH IDENTIFICATION\n"
+    "• Name: {dish_name}\n"
+    "• Cuisine: {cuisine_type}\n"
+    "• Confidence: {confidence_level}"
+    "{description_line}",
+
+    "📏 SERVING SIZE"
+    "{weight_line}\n"
+    "• Size: {serving_description}",
+
+    "🔥 NUTRITION FACTS (per serving)\n"
+    "• Calories: {calories}\n"
+    "• Protein: {protein_g}g\n"
+    "• Carbohydrates: {carbohydrates_g}g\n"
+    "• Fat: {fat_g}g\n"
+    "• Fiber: {fiber_g}g\n"
+    "• Sugar: {sugar_g}g\n"
+    "• Sodium: {sodium_mg}mg"
+    "{vitamins_line}{minerals_line}",
+
+    "💪 HEALTH ANALYSIS\n"
+    "• Health Score: {health_score}/100 (Grade: {health_grade})"
+    "{strengths_block}{concerns_block}{assessment_line}",
+
+    "💡 IMPROVEMENT SUGGESTIONS"
+    "{alternatives_block}{portion_line}{cooking_block}",
+
+    "🚨 DIETARY INFORMATION"
+    "{allergens_line}{dietary_line}",
+)
+
+# Placeholder values used when the extracted field is empty
+_USER_MESSAGE_DEFAULTS = types.MappingProxyType({
+    'dish_name': 'Unknown dish',
+    'cuisine_type': 'Unknown',
+    'confidence_level': 'Medium',
+    'serving_description': 'Standard serving',
+    'calories': 0,
+    'protein_g': 0,
+    'carbohydrates_g': 0,
+    'fat_g': 0,
+    'fiber_g': 0,
+    'sugar_g': 0,
+    'sodium_mg': 0,
+    'health_score': 0,
+    'health_grade': 'N/A'
+})
+
+_DIETARY_FLAG_LABELS = (
+    ('is_vegetarian', 'Vegetarian'),
+    ('is_vegan', 'Vegan'),
+    ('is_gluten_free', 'Gluten Free'),
+    ('is_dairy_free', 'Dairy Free'),
+    ('is_keto_friendly', 'Keto Friendly'),
+    ('is_low_sodium', 'Low Sodium')
+)
+
+
+def _optional_line(prefix: str, value) -> str:
+    """Render `prefix` and the value on a new line, or nothing when the value is empty"""
+    return f"\n{prefix}{value}" if value else ""
+
+
+def _optional_list_line(prefix: str, items) -> str:
+    """Render a comma-separated line, or nothing when the list is empty"""
+    return f"\n{prefix}{', '.join(items)}" if items else ""
+
+
+def _bullet_block(title: str, items, limit: int) -> str:
+    """Render a titled bullet list of at most `limit` items, or nothing when empty"""
+    if not items:
+        return ""
+    return "\n" + title + "".join(f"\n  - {item}" for item in items[:limit])
+
+
+class NutritionAnalyzer:
+    def __init__(self, language_manager, db_manager=None):
+        self.language_manager = language_manager
+        self.db_manager = db_manager
+        # Process-local front for analysis_cache, keyed by (image hash, language)
+        self._analysis_cache = LRUCache(maxsize=2048)
+        self._analysis_cache_lock = threading.Lock()
+        
+        try:
+            self.model = genai.GenerativeModel(GEMINI_MODEL_NAME)
+            logger.info("Nutrition analyzer initialized successfully")
+        except Exception as e:
+            logger.error(f"Failed to initialize nutrition analyzer: {e}")
+            raise
+
+    def analyze_image_bytes(self, image_bytes: bytes, language: str = 'en') -> tuple[str, dict]:
+        """Analyze raw image bytes, reusing earlier results for identical images"""
+        image_hash = hashlib.blake2b(image_bytes, digest_size=16).digest()
+        cache_key = (image_hash, language)
+        
+        with self._analysis_cache_lock:
+            nutrition_data = self._analysis_cache.get(cache_key)
+        
+        if nutrition_data is None and self.db_manager:
+            nutrition_data = self.db_manager.get_cached_analysis(image_hash, language)
+            if nutrition_data:
+                with self._analysis_cache_lock:
+                    self._analysis_cache[cache_key] = nutrition_data
+        
+        if nutrition_data:
+            logger.debug("Analysis cache hit for image %s", image_hash.hex())
+            return self._create_user_message(nutrition_data, language), nutrition_data
+        
+        if image_bytes[:3] == b'\xff\xd8\xff':
+            # Already a (downscaled) JPEG: send the bytes inline so the SDK does not decode and re-encode them
+            image = {'mime_type': 'image/jpeg', 'data': image_bytes}
+        else:
+            image = Image.open(io.BytesIO(image_bytes))
+        user_message, nutrition_data = self.analyze_image(image, language)
+        
+        # Only successful food analyses are worth reusing
+        if nutrition_data:
+            with self._analysis_cache_lock:
+                self._analysis_cache[cache_key] = nutrition_data
+            if self.db_manager:
+                self.db_manager.save_cached_analysis(image_hash, language, nutrition_data)
+        
+        return user_message, nutrition_data
+
+    def analyze_image(self, image: Any, language: str = 'en') -> tuple[str, dict]:
+        """Analyze food image (PIL image or inline JPEG blob) and return nutrition information in specified language"""
+
+        # Enhanced prompt for better JSON extraction, pre-rendered for the requested language
+        enhanced_prompt = NUTRITION_PROMPTS.get(language, NUTRITION_PROMPTS['en'])
+
         try:
             response = self.model.generate_content([enhanced_prompt, image])
-            json_response = response.text.strip()
+            # Not stripped here; _clean_json_response slices out the object, which drops surrounding whitespace too
+            json_response = response.text
+            # Slices and key lists are only built when debug logging is on
+            debug_enabled = logger.isEnabledFor(logging.DEBUG)
             
-            print(f"🔍 RAW GEMINI RESPONSE (first 200 chars): {json_response[:200]}")
-            print(f"🔍 RESPONSE TYPE: {type(json_response)}")
+            if debug_enabled:
+                logger.debug("Raw Gemini response (first 200 chars): %s", json_response[:200])
 
             # Clean the response to ensure it's valid JSON
             json_response = self._clean_json_response(json_response)
             
-            print(f"🔍 CLEANED RESPONSE (first 200 chars): {json_response[:200]}")
+            if debug_enabled:
+                logger.debug("Cleaned response (first 200 chars): %s", json_response[:200])
 
-            # Parse JSON
-            nutrition_data = json.loads(json_response)
-            print(f"🔍 PARSED DATA TYPE: {type(nutrition_data)}")
-            print(f"🔍 PARSED DATA KEYS: {list(nutrition_data.keys()) if isinstance(nutrition_data, dict) else 'NOT A DICT'}")
+            # Parse JSON; orjson's decode error subclasses json.JSONDecodeError
+            nutrition_data = orjson.loads(json_response) if orjson else json.loads(json_response)
             
-            if isinstance(nutrition_data, dict) and 'nutrition_facts' in nutrition_data:
-                print(f"🔍 NUTRITION FACTS: {nutrition_data['nutrition_facts']}")
+            if debug_enabled:
+                logger.debug("Parsed data keys: %s", list(nutrition_data.keys()) if isinstance(nutrition_data, dict) else type(nutrition_data).__name__)
+                if isinstance(nutrition_data, dict) and 'nutrition_facts' in nutrition_data:
+                    logger.debug("Nutrition facts: %s", nutrition_data['nutrition_facts'])
 
             # Check if it's a food image
             if not nutrition_data.get('is_food', True):
@@ -1391,13 +1997,13 @@ class NutritionAnalyzer:
             return user_message, nutrition_data
 
         except json.JSONDecodeError as e:
-            print(f"❌ JSON DECODE ERROR: {e}")
-            print(f"❌ FAILED ON TEXT: {json_response}")
+            logger.error(f"JSON decode error in Gemini response: {e}")
+            logger.debug("Failed on text: %s", json_response)
             # Fallback to original method or simple message
             return self._handle_json_error(language), {}
 
         except Exception as e:
-            print(f"❌ GENERAL ERROR: {e}")
+            logger.error(f"Error analyzing image: {e}")
             return self._get_error_message(language), {}
                     
     def _create_non_food_message(self, response_data: dict, language: str) -> str:
@@ -1406,20 +2012,9 @@ class NutritionAnalyzer:
             image_description = response_data.get('image_description', '')
             ai_message = response_data.get('message', '')
         
-            # Use the hardcoded messages instead of language_manager
-            non_food_messages = {
-                'en': f"🚫 This appears to be: {image_description}\n\n{ai_message}\n\nPlease send a clear photo of food for nutrition analysis! 📸🍽️",
-                'ta': f"🚫 இது தோன்றுகிறது: {image_description}\n\n{ai_message}\n\nஊட்டச்சத்து பகுப்பாய்வுக்கு உணவின் தெளிவான புகைப்படத்தை அனுப்பவும்! 📸🍽️",
-                'te': f"🚫 ఇది కనిపిస్తోంది: {image_description}\n\n{ai_message}\n\nపోషకాహార విశ్లేషణ కోసం ఆహారం యొక్క స్పష్టమైన ఫోటోను పంపండి! 📸🍽️",
-                'hi': f"🚫 यह दिखाई दे रहा है: {image_description}\n\n{ai_message}\n\nपोषण विश्लेषण के लिए भोजन की स्पष्ट तस्वीर भेजें! 📸🍽️",
-                'kn': f"🚫 ಇದು ಕಾಣಿಸುತ್ತದೆ: {image_description}\n\n{ai_message}\n\nಪೋಷಣೆ ವಿಶ್ಲೇಷಣೆಗಾಗಿ ಆಹಾರದ ಸ್ಪಷ್ಟ ಫೋಟೋವನ್ನು ಕಳುಹಿಸಿ! 📸🍽️",
-                'ml': f"🚫 ഇത് കാണുന്നത്: {image_description}\n\n{ai_message}\n\nപോഷകാഹാര വിശകലനത്തിനായി ഭക്ഷണത്തിന്റെ വ്യക്തമായ ഫോട്ടോ അയയ്ക്കുക! 📸🍽️",
-                'mr': f"🚫 हे दिसत आहे: {image_description}\n\n{ai_message}\n\nपोषण विश्लेषणासाठी अन्नाचा स्पष्ट फोटो पाठवा! 📸🍽️",
-                'gu': f"🚫 આ દેખાય છે: {image_description}\n\n{ai_message}\n\nપોષણ વિશ્લેષણ માટે ખોરાકનો સ્પષ્ટ ફોટો મોકલો! 📸🍽️",
-                'bn': f"🚫 এটি দেখা যাচ্ছে: {image_description}\n\n{ai_message}\n\nপুষ্টি বিশ্লেষণের জন্য খাবারের স্পষ্ট ছবি পাঠান! 📸🍽️"
-            }
-            
-            return non_food_messages.get(language, non_food_messages['en'])
+            # Use the hardcoded messages instead of language_manager; only the chosen template is filled in
+            template = NON_FOOD_MESSAGE_TEMPLATES.get(language, NON_FOOD_MESSAGE_TEMPLATES['en'])
+            return template.format(image_description=image_description, ai_message=ai_message)
             
         except Exception as e:
             logger.error(f"Error creating non-food message: {e}")
@@ -1428,19 +2023,7 @@ class NutritionAnalyzer:
     def _get_non_food_fallback_message(self, language: str) -> str:
         """Simple fallback message with hardcoded messages"""
         try:
-            fallback_messages = {
-                'en': "🚫 This doesn't appear to be a food image. Please send a clear photo of food for nutrition analysis!",
-                'ta': "🚫 இது உணவு படம் அல்ல. ஊட்டச்சத்து பகுப்பாய்வுக்கு உணவின் தெளிவான புகைப்படத்தை அனுப்பவும்!",
-                'te': "🚫 ఇది ఆహార చిత్రం కాదు. పోషకాహార విశ్లేషణ కోసం ఆహారం యొక్క స్పష్టమైన ఫోటోను పంపండి!",
-                'hi': "🚫 यह भोजन की तस्वीर नहीं लगती। कृपया पोषण विश्लेషण के लिए भोजन की स्पष्ट तस्वీर भेजें!",
-                'kn': "🚫 ಇದು ಆಹಾರ ಚಿತ್ರವಲ್ಲ. ಪೋಷಣೆ ವಿಶ್ಲೇಷಣೆಗಾಗಿ ಆಹಾರದ ಸ್ಪಷ್ಟ ಫೋಟೋವನ್ನು ಕಳುಹಿಸಿ!",
-                'ml': "🚫 ഇത് ഭക്ഷണ ചിത്രമല്ല. പോഷകാഹാര വിശകലനത്തിനായി ഭക്ഷണത്തിന്റെ വ്യക്തമായ ഫോട്ടോ അയയ്ക്കുക!",
-                'mr': "🚫 हा अन्नाचा फोटो नाही. पोषण विश्लेषणासाठी अन्नाचा स्पष्ट फोटो पाठवा!",
-                'gu': "🚫 આ ખોરાકનો ફોટો નથી. પોષણ વિશ્લેષણ માટે ખોરાકનો સ્પષ્ટ ફોટો મોકલો!",
-                'bn': "🚫 এটি খাবারের ছবি নয়। পুষ্টি বিশ্লেষণের জন্য খাবারের স্পষ্ট ছবি পাঠান!"
-            }
-            
-            return fallback_messages.get(language, fallback_messages['en'])
+            return NON_FOOD_FALLBACK_MESSAGES.get(language, NON_FOOD_FALLBACK_MESSAGES['en'])
             
         except Exception as e:
             logger.error(f"Error getting fallback message: {e}")
@@ -1450,132 +2033,42 @@ class NutritionAnalyzer:
 
     def _clean_json_response(self, response: str) -> str:
         """Clean the JSON response to ensure it's valid"""
-        try:
-            # Remove any markdown formatting
-            response = response.strip()
-            if response.startswith('```json'):
-                response = response[7:]
-            if response.startswith('```'):
-                response = response[3:]
-            if response.endswith('```'):
-                response = response[:-3]
-
-            # Find the first { and last } to extract just the JSON
-            start_idx = response.find('{')
-            end_idx = response.rfind('}')
-
-            if start_idx != -1 and end_idx != -1:
-                response = response[start_idx:end_idx + 1]
+        # The object runs from the first { to the last }, which also skips any markdown fence around
+        # it; one slice instead of stripping the fence and then slicing again
+        start_idx = response.find('{')
+        end_idx = response.rfind('}')
 
-            return response.strip()
-
-        except Exception as e:
-            logger.error(f"Error cleaning JSON response: {e}")
-            return response
+        if start_idx != -1 and end_idx > start_idx:
+            return response[start_idx:end_idx + 1]
+        return response.strip()
 
     def _create_user_message(self, nutrition_data: dict, language: str) -> str:
         """Create a formatted user message from parsed JSON data - REFACTORED VERSION"""
         try:
-            db = DatabaseManager()
-            # Extract structured data using the same helper
-            fields = db._extract_fields_for_db(nutrition_data, language)
-        
-            # Language-specific emojis and formatting
-            message_parts = []
-
-            # Dish identification section
-            message_parts.append("🍽️ DISH IDENTIFICATION")
-            message_parts.append(f"• Name: {fields['dish_name'] or 'Unknown dish'}")
-            message_parts.append(f"• Cuisine: {fields['cuisine_type'] or 'Unknown'}")
-            message_parts.append(f"• Confidence: {fields['confidence_level'] or 'Medium'}")
-            if fields['dish_description']:
-                message_parts.append(f"• Description: {fields['dish_description']}")
-            message_parts.append("")
-
-            # Serving size section
-            message_parts.append("📏 SERVING SIZE")
-            if fields['estimated_weight_grams'] and fields['estimated_weight_grams'] > 0:
-                message_parts.append(f"• Weight: ~{fields['estimated_weight_grams']}g")
-            message_parts.append(f"• Size: {fields['serving_description'] or 'Standard serving'}")
-            message_parts.append("")
-
-            # Nutrition facts section
-            message_parts.append("🔥 NUTRITION FACTS (per serving)")
-            message_parts.append(f"• Calories: {fields['calories'] or 0}")
-            message_parts.append(f"• Protein: {fields['protein_g'] or 0}g")
-            message_parts.append(f"• Carbohydrates: {fields['carbohydrates_g'] or 0}g")
-            message_parts.append(f"• Fat: {fields['fat_g'] or 0}g")
-            message_parts.append(f"• Fiber: {fields['fiber_g'] or 0}g")
-            message_parts.append(f"• Sugar: {fields['sugar_g'] or 0}g")
-            message_parts.append(f"• Sodium: {fields['sodium_mg'] or 0}mg")
-
-            # Vitamins and minerals
-            if fields['key_vitamins']:
-                message_parts.append(f"• Key Vitamins: {', '.join(fields['key_vitamins'])}")
-            if fields['key_minerals']:
-                message_parts.append(f"• Key Minerals: {', '.join(fields['key_minerals'])}")
-            message_parts.append("")
-
-            # Health analysis section
-            message_parts.append("💪 HEALTH ANALYSIS")
-            health_score = fields['health_score'] or 0
-            health_grade = fields['health_grade'] or 'N/A'
-            message_parts.append(f"• Health Score: {health_score}/100 (Grade: {health_grade})")
-
-            if fields['nutritional_strengths']:
-                message_parts.append("• Nutritional Strengths:")
-                for strength in fields['nutritional_strengths'][:3]:  # Limit to top 3
-                    message_parts.append(f"  - {strength}")
-
-            if fields['areas_of_concern']:
-                message_parts.append("• Areas of Concern:")
-                for concern in fields['areas_of_concern'][:3]:  # Limit to top 3
-                    message_parts.append(f"  - {concern}")
-
-            if fields['overall_assessment']:
-                message_parts.append(f"• Assessment: {fields['overall_assessment']}")
-            message_parts.append("")
-
-            # Improvement suggestions
-            message_parts.append("💡 IMPROVEMENT SUGGESTIONS")
-            if fields['healthier_alternatives']:
-                message_parts.append("• Healthier Options:")
-                for alt in fields['healthier_alternatives'][:2]:  # Limit to top 2
-                    message_parts.append(f"  - {alt}")
-
-            if fields['portion_recommendations']:
-                message_parts.append(f"• Portion Advice: {fields['portion_recommendations']}")
-
-            if fields['cooking_modifications']:
-                message_parts.append("• Cooking Tips:")
-                for mod in fields['cooking_modifications'][:2]:  # Limit to top 2
-                    message_parts.append(f"  - {mod}")
-            message_parts.append("")
-
-            # Dietary information
-            message_parts.append("🚨 DIETARY INFORMATION")
-            if fields['potential_allergens']:
-                message_parts.append(f"• Potential Allergens: {', '.join(fields['potential_allergens'])}")
-
-            # Build dietary compatibility tags
-            dietary_tags = []
-            dietary_flags = {
-                'is_vegetarian': 'Vegetarian',
-                'is_vegan': 'Vegan', 
-                'is_gluten_free': 'Gluten Free',
-                'is_dairy_free': 'Dairy Free',
-                'is_keto_friendly': 'Keto Friendly',
-                'is_low_sodium': 'Low Sodium'
-            }
-        
-            for flag, label in dietary_flags.items():
-                if fields.get(flag):
-                    dietary_tags.append(label)
-
-            if dietary_tags:
-                message_parts.append(f"• Suitable for: {', '.join(dietary_tags)}")
+            # Extract structured data using the same helper; it is static, so no DatabaseManager is built per reply
+            fields = DatabaseManager._extract_fields_for_db(nutrition_data, language)
+
+            # Missing values fall back to the same defaults the old line-by-line builder used
+            values = {key: fields[key] or default for key, default in _USER_MESSAGE_DEFAULTS.items()}
+
+            # Optional lines carry their own leading newline so absent ones render as nothing
+            weight = fields['estimated_weight_grams']
+            values['weight_line'] = f"\n• Weight: ~{weight}g" if weight and weight > 0 else ""
+            values['description_line'] = _optional_line("• Description: ", fields['dish_description'])
+            values['vitamins_line'] = _optional_list_line("• Key Vitamins: ", fields['key_vitamins'])
+            values['minerals_line'] = _optional_list_line("• Key Minerals: ", fields['key_minerals'])
+            values['strengths_block'] = _bullet_block("• Nutritional Strengths:", fields['nutritional_strengths'], 3)
+            values['concerns_block'] = _bullet_block("• Areas of Concern:", fields['areas_of_concern'], 3)
+            values['assessment_line'] = _optional_line("• Assessment: ", fields['overall_assessment'])
+            values['alternatives_block'] = _bullet_block("• Healthier Options:", fields['healthier_alternatives'], 2)
+            values['portion_line'] = _optional_line("• Portion Advice: ", fields['portion_recommendations'])
+            values['cooking_block'] = _bullet_block("• Cooking Tips:", fields['cooking_modifications'], 2)
+            values['allergens_line'] = _optional_list_line("• Potential Allergens: ", fields['potential_allergens'])
+            values['dietary_line'] = _optional_list_line(
+                "• Suitable for: ", [label for flag, label in _DIETARY_FLAG_LABELS if fields.get(flag)]
+            )
 
-            return "\n".join(message_parts)
+            return "\n\n".join(template.format_map(values) for template in _USER_MESSAGE_SECTIONS)
 
         except Exception as e:
             logger.error(f"Error creating user message: {e}")
@@ -1588,54 +2081,29 @@ class NutritionAnalyzer:
             calories = nutrition_data.get('nutrition_facts', {}).get('calories', 0)
             health_score = nutrition_data.get('health_analysis', {}).get('health_score', 0)
 
-            fallback_messages = {
-                'en': f"🍽️ Analyzed: {dish_name}\n🔥 Calories: {calories}\n💪 Health Score: {health_score}/10\n\n📸 Send another food photo for more analysis!",
-                'ta': f"🍽️ பகுப்பாய்வு: {dish_name}\n🔥 கலோரிகள்: {calories}\n💪 ஆரோக்கிய மதிப்பெண்: {health_score}/10\n\n📸 மேலும் பகுப்பாய்வுக்கு மற்றொரு உணவு புகைப்படம் அனுப்பவும்!",
-                'hi': f"🍽️ विश्लेषण: {dish_name}\n🔥 कैलोरी: {calories}\n💪 स्वास्थ्य स्कोर: {health_score}/10\n\n📸 अधिक विश्लेषण के लिए दूसरी खाना फोटो भेजें!"
-            }
-
-            return fallback_messages.get(language, fallback_messages['en'])
+            template = ANALYSIS_FALLBACK_TEMPLATES.get(language, ANALYSIS_FALLBACK_TEMPLATES['en'])
+            return template.format(dish_name=dish_name, calories=calories, health_score=health_score)
 
         except Exception:
             return self._get_error_message(language)
     def _handle_json_error(self, language: str) -> str:
         """Handle JSON parsing errors"""
-        error_messages = {
-            'en': "🤖 I analyzed your food but had trouble formatting the response. Please try again with another photo.",
-            'ta': "🤖 உங்கள் உணவை பகுப்பாய்வு செய்தேன் ஆனால் பதிலை வடிவமைப்பதில் சிக்கல் ஏற்பட்டது. மற்றொரு புகைப்படத்துடன் மீண்டும் முயற்சிக்கவும்.",
-            'hi': "🤖 मैंने आपके भोजन का विश्लेषण किया लेकिन उत्तर को प्रारूपित करने में परेशानी हुई। कृपया दूसरी तस्वीर के साथ पुनः प्रयास करें।"
-        }
-        return error_messages.get(language, error_messages['en'])
+        return JSON_ERROR_MESSAGES.get(language, JSON_ERROR_MESSAGES['en'])
     def _get_error_message(self, language: str) -> str:
         """Get error message in specified language"""
-        error_messages = {
-            'en': "❌ Sorry, I couldn't analyze this image. Please try again with a clearer photo of your food.",
-            'ta': "❌ மன்னிக்கவும், இந்த படத்தை பகுப்பாய்வு செய்ய முடியவில்லை. உங்கள் உணவின் தெளிவான புகைப்படத்துடன் மீண்டும் முயற்சிக்கவும்.",
-            'te': "❌ క్షమించండి, ఈ చిత్రాన్ని విశ్లేషించలేకపోయాను. దయచేసి మీ ఆహారం యొక్క స్పష్టమైన ఫోటోతో మళ్లీ ప్రయత్నించండి.",
-            'hi': "❌ क्षमा करें, मैं इस छवि का विश्लेषण नहीं कर सका। कृपया अपने भोजन की स्पष्ट तस्वीर के साथ पुनः प्रयास करें।",
-            'kn': "❌ ಕ್ಷಮಿಸಿ, ನಾನು ಈ ಚಿತ್ರವನ್ನು ವಿಶ್ಲೇಷಿಸಲು ಸಾಧ್ಯವಾಗಲಿಲ್ಲ. ದಯವಿಟ್ಟು ನಿಮ್ಮ ಆಹಾರದ ಸ್ಪಷ್ಟ ಫೋಟೋದೊಂದಿಗೆ ಮತ್ತೆ ಪ್ರಯತ್ನಿಸಿ.",
-            'ml': "❌ ക്ഷമിക്കണം, ഈ ചിത്രം വിശകലനം ചെയ്യാൻ എനിക്ക് കഴിഞ്ഞില്ല. ദയവായി നിങ്ങളുടെ ഭക്ഷണത്തിന്റെ വ്യക്തമായ ഫോട്ടോ ഉപയോഗിച്ച് വീണ്ടും ശ്രമിക്കുക.",
-            'mr': "❌ माफ करा, मी या प्रतिमेचे विश्लेषण करू शकलो नाही. कृपया आपल्या अन्नाच्या स्पष्ट फोटोसह पुन्हा प्रयत्न करा.",
-            'gu': "❌ માફ કરશો, હું આ છબીનું વિશ્લેષણ કરી શક્યો નથી. કૃપા કરીને તમારા ખોરાકના સ્પષ્ટ ફોટો સાથે ફરીથી પ્રયાસ કરો.",
-            'bn': "❌ দুঃখিত, আমি এই ছবিটি বিশ্লেষণ করতে পারিনি। দয়া করে আপনার খাবারের স্পষ্ট ফটো দিয়ে আবার চেষ্টা করুন।"
-        }
-        return error_messages.get(language, error_messages['en'])
+        return ANALYSIS_ERROR_MESSAGES.get(language, ANALYSIS_ERROR_MESSAGES['en'])
 
 class WhatsAppBot:
     def __init__(self, token: str, phone_number_id: str):
         self.token = token
         self.phone_number_id = phone_number_id
         self.base_url = f"https://graph.facebook.com/v17.0/{phone_number_id}"
+        self.messages_url = f"{self.base_url}/messages"
+        # Auth headers are fixed for the bot's lifetime
+        self.auth_headers = {'Authorization': f'Bearer {token}'}
         
     def send_message(self, to: str, message: str) -> bool:
         """Send text message to WhatsApp user"""
-        url = f"{self.base_url}/messages"
-        
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-        
         data = {
             'messaging_product': 'whatsapp',
             'to': to,
@@ -1644,9 +2112,9 @@ class WhatsAppBot:
         }
         
         try:
-            response = requests.post(url, headers=headers, json=data, timeout=30)
+            response = http_session.post(self.messages_url, headers=self.auth_headers, json=data, timeout=30)
             if response.status_code == 200:
-                logger.info(f"Message sent successfully to {to}")
+                logger.debug("Message sent successfully to %s", to)
                 return True
             else:
                 logger.error(f"Failed to send message: {response.status_code} - {response.text}")
@@ -1660,9 +2128,8 @@ class WhatsAppBot:
         try:
             # Get media URL
             url = f"https://graph.facebook.com/v17.0/{media_id}"
-            headers = {'Authorization': f'Bearer {self.token}'}
             
-            response = requests.get(url, headers=headers, timeout=30)
+            response = http_session.get(url, headers=self.auth_headers, timeout=30)
             if response.status_code != 200:
                 raise Exception(f"Failed to get media URL: {response.status_code}")
             
@@ -1673,11 +2140,11 @@ class WhatsAppBot:
                 raise Exception("No media URL found")
             
             # Download the actual media file
-            media_response = requests.get(media_url, headers=headers, timeout=60)
-            if media_response.status_code != 200:
-                raise Exception(f"Failed to download media: {media_response.status_code}")
-            
-            return media_response.content
+            with http_session.get(media_url, headers=self.auth_headers, timeout=60, stream=True) as media_response:
+                if media_response.status_code != 200:
+                    raise Exception(f"Failed to download media: {media_response.status_code}")
+                
+                return read_streamed_content(media_response)
             
         except Exception as e:
             logger.error(f"Error downloading media {media_id}: {e}")
@@ -1693,24 +2160,19 @@ class ElevenZABot:
     def send_messages(self, to_number: str, message: str):
         """Send text message via 11za API"""
         try:
-            payload = json.dumps({
+            payload = {
                 "sendto": to_number,
                 "authToken": self.auth_token,
                 "originWebsite": self.origin_website,
                 "contentType": "text",
                 "text": message
-            }).encode("utf-8")
-            
-            req = urllib.request.Request(
-                self.send_url,
-                data=payload,
-                headers={"Content-Type": "application/json"},
-                method="POST"
-            )
+            }
             
-            with urllib.request.urlopen(req) as resp:
-                logger.info(f"Message sent to {to_number}: {resp.status}")
-                return resp.status == 200
+            # Shared keep-alive session instead of a new urllib connection per message
+            response = http_session.post(self.send_url, json=payload, timeout=30)
+            response.raise_for_status()
+            logger.debug("Message sent to %s: %s", to_number, response.status_code)
+            return response.status_code == 200
                 
         except Exception as e:
             logger.error(f"Error sending message to {to_number}: {e}")
@@ -1719,9 +2181,9 @@ class ElevenZABot:
     def download_media(self, media_url: str) -> bytes:
         """Download media from 11za URL"""
         try:
-            req = urllib.request.Request(media_url)
-            with urllib.request.urlopen(req) as response:
-                return response.read()
+            with http_session.get(media_url, timeout=60, stream=True) as response:
+                response.raise_for_status()
+                return read_streamed_content(response)
         except Exception as e:
             logger.error(f"Error downloading media from {media_url}: {e}")
             return None
@@ -1731,7 +2193,7 @@ try:
     db_manager = DatabaseManager()
     s3_manager = S3Manager()
     language_manager = LanguageManager(db_manager)
-    analyzer = NutritionAnalyzer(language_manager)
+    analyzer = NutritionAnalyzer(language_manager, db_manager)
     whatsapp_bot = WhatsAppBot(WHATSAPP_TOKEN, WHATSAPP_PHONE_NUMBER_ID)
     elevenza_bot = ElevenZABot()
     logger.info("All components initialized successfully")
@@ -1739,6 +2201,55 @@ except Exception as e:
     logger.error(f"Failed to initialize components: {e}")
     raise
 
+def _session_cleanup_loop():
+    """Periodically delete stale registration sessions"""
+    while True:
+        time.sleep(SESSION_CLEANUP_INTERVAL_SECONDS)
+        db_manager.cleanup_old_registration_sessions()
+
+# Background message processing. Each sender is pinned to one queue with a single
+# worker, so a user's messages are still handled in the order they arrived.
+_message_queues = [queue.Queue(maxsize=MESSAGE_QUEUE_SIZE) for _ in range(MESSAGE_WORKERS)]
+# Threads do not survive fork, so started state is tracked per pid
+_background_workers_pid = None
+_background_workers_lock = threading.Lock()
+
+def _message_worker_loop(message_queue: queue.Queue):
+    """Run queued message handlers one at a time"""
+    while True:
+        handler, args = message_queue.get()
+        try:
+            handler(*args)
+        except Exception as e:
+            logger.error(f"Error in background message handler {handler.__name__}: {e}")
+        finally:
+            message_queue.task_done()
+
+def _ensure_background_workers_started():
+    """Start the message workers and session cleanup thread once per process"""
+    global _background_workers_pid
+    if _background_workers_pid == os.getpid():
+        return
+    with _background_workers_lock:
+        if _background_workers_pid != os.getpid():
+            for index, message_queue in enumerate(_message_queues):
+                threading.Thread(
+                    target=_message_worker_loop, args=(message_queue,),
+                    name=f'message-worker-{index}', daemon=True
+                ).start()
+            threading.Thread(target=_session_cleanup_loop, name='session-cleanup', daemon=True).start()
+            _background_workers_pid = os.getpid()
+
+def enqueue_message(sender: str, handler, *args):
+    """Queue a message handler for background processing, running it inline if the queue is full"""
+    _ensure_background_workers_started()
+    message_queue = _message_queues[hash(sender) % len(_message_queues)]
+    try:
+        message_queue.put_nowait((handler, args))
+    except queue.Full:
+        logger.warning(f"Message queue full, processing message from {sender} inline")
+        handler(*args)
+
 @app.route('/', methods=['GET'])
 def health():
     """Root endpoint for health check"""
@@ -1783,7 +2294,7 @@ def handle_webhook():
                 messages = value.get('messages', [])
                 
                 for message in messages:
-                    process_message(message)
+                    enqueue_message(message.get('from'), process_message, message)
         
         return jsonify({'status': 'success'}), 200
         
@@ -1797,7 +2308,7 @@ def process_message(message: Dict[str, Any]):
         message_type = message.get('type')
         sender = message.get('from')
         
-        logger.info(f"Processing {message_type} message from {sender}")
+        logger.info("Processing %s message from %s", message_type, sender)
         
         if message_type == 'text':
             handle_text_message(message)
@@ -1817,21 +2328,23 @@ def handle_text_message(message: Dict[str, Any]):
     """Handle incoming text messages"""
     try:
         sender = message.get('from')
+        # Normalized once here; every downstream handler relies on this form
         text_content = message.get('text', {}).get('body', '').strip().lower()
         
-        logger.info(f"Text message from {sender}: {text_content}")
+        logger.debug("Text message from %s: %s", sender, text_content)
         
         # Check if user exists
         user = db_manager.get_user_by_phone(sender)
         
         # Handle different text commands
-        if text_content in ['start', 'hello', 'hi', 'hey']:
+        command = COMMAND_INTENTS.get(text_content)
+        if command == 'start':
             handle_start_command(sender, user)
-        elif text_content == 'help':
+        elif command == 'help':
             handle_help_command(sender, user)
-        elif text_content == 'language':
+        elif command == 'language':
             handle_language_command(sender)
-        elif is_language_selection(text_content):
+        elif command == 'language_selection':
             handle_language_selection(sender, text_content, user)
         elif not user:
             # User doesn't exist, start registration
@@ -1853,13 +2366,13 @@ def handle_image_message(message: Dict[str, Any]):
         image_data = message.get('image', {})
         media_id = image_data.get('id')
         
-        logger.info(f"Image message from {sender}, media_id: {media_id}")
+        logger.debug("Image message from %s, media_id: %s", sender, media_id)
         
         # Check if user exists
         user = db_manager.get_user_by_phone(sender)
         if not user:
             # User doesn't exist, start registration with language
-            welcome_message = language_manager.get_message('en', 'language_selection') + "\n\n" + language_manager.get_language_options_text()
+            welcome_message = language_manager.get_message_with_language_options('en', 'language_selection')
             whatsapp_bot.send_message(sender, welcome_message)
             db_manager.update_registration_session(sender, 'language', {})
             return
@@ -1873,50 +2386,52 @@ def handle_image_message(message: Dict[str, Any]):
         
         user_language = user.get('preferred_language', 'en')
         
-        # Send analysis started message
+        # Send analysis started message while the image downloads
         analyzing_message = language_manager.get_message(user_language, 'analyzing')
-        whatsapp_bot.send_message(sender, analyzing_message)
+        analyzing_future = io_executor.submit(whatsapp_bot.send_message, sender, analyzing_message)
         
         # Download and process image
         try:
             # Download image from WhatsApp
-            image_bytes = whatsapp_bot.download_media(media_id)
+            try:
+                image_bytes = whatsapp_bot.download_media(media_id)
+            finally:
+                # Keep the analyzing notice ahead of every later reply, including errors
+                analyzing_future.result()
+            
+            # Shrink once so S3 and Gemini both get the smaller payload
+            image_bytes = optimize_image(image_bytes)
+            
+            # Upload to S3 in the background while Gemini analyzes the same bytes
+            upload_future = io_executor.submit(s3_manager.upload_image, image_bytes, user['user_id'])
             
-            # Upload to S3
-            image_url, file_location = s3_manager.upload_image(image_bytes, user['user_id'])
+            # Analyze image - now returns formatted message and structured JSON
+            user_message, nutrition_json = analyzer.analyze_image_bytes(image_bytes, user_language)
+            
+            image_url, file_location = upload_future.result()
             
             if not image_url or not file_location:
                 error_message = language_manager.get_message(user_language, 'image_processing_error')
                 whatsapp_bot.send_message(sender, error_message)
                 return
             
-            # Convert bytes to PIL Image for analysis
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Analyze image - now returns formatted message and structured JSON
-            user_message, nutrition_json = analyzer.analyze_image(image, user_language)
-            
             # Enhanced logging of structured data
             if nutrition_json:
                 dish_name = nutrition_json.get('dish_identification', {}).get('name', 'Unknown')
                 calories = nutrition_json.get('nutrition_facts', {}).get('calories', 0)
                 health_score = nutrition_json.get('health_analysis', {}).get('health_score', 0)
-                logger.info(f"Analyzed: {dish_name}, Calories: {calories}, Health Score: {health_score}")
+                logger.info("Analyzed: %s, Calories: %s, Health Score: %s", dish_name, calories, health_score)
             
-            # Save analysis with comprehensive nutrient details
-            success = db_manager.save_nutrition_analysis(
+            # Save analysis with comprehensive nutrient details; the reply doesn't wait on the INSERT
+            db_manager.queue_nutrition_analysis(
                 user_id=user['user_id'],
                 file_location=file_location,
                 analysis_result=user_message,
                 language=user_language,
-                nutrition_data=nutrition_json
+                nutrition_data=nutrition_json,
+                image_url=image_url
             )
             
-            if not success:
-                logger.error(f"Failed to save nutrition analysis for user {user['user_id']}")
-            else:
-                logger.info(f"Successfully saved nutrition analysis for user {user['user_id']}")
-            
             # Send the formatted analysis result to user
             whatsapp_bot.send_message(sender, user_message)
             
@@ -1937,14 +2452,16 @@ def handle_image_message(message: Dict[str, Any]):
     except Exception as e:
         logger.error(f"Error handling image message: {e}")
 
+# Health warnings for low-scoring foods, keyed by language
+HEALTH_WARNING_MESSAGES = {
+    'en': "⚠️ This food has a low health score. Consider balancing it with healthier options or eating smaller portions.",
+    'ta': "⚠️ இந்த உணவு குறைந்த ஆரோக்கிய மதிப்பெண் கிடைத்துள்ளது. ஆரோக்கியமான விருப்பங்களுடன் சமநிலைப்படுத்த அல்லது சிறிய பகுதிகளை சாப்பிட பரிசீலிக்கவும்.",
+    'hi': "⚠️ इस भोजन का स्वास्थ्य स्कोर कम है। इसे स्वस्थ विकल्पों के साथ संतुलित करने या छोटे हिस्से खाने पर विचार करें।"
+}
+
 def get_health_warning_message(language: str) -> str:
     """Get health warning message for low-scoring foods"""
-    warnings = {
-        'en': "⚠️ This food has a low health score. Consider balancing it with healthier options or eating smaller portions.",
-        'ta': "⚠️ இந்த உணவு குறைந்த ஆரோக்கிய மதிப்பெண் கிடைத்துள்ளது. ஆரோக்கியமான விருப்பங்களுடன் சமநிலைப்படுத்த அல்லது சிறிய பகுதிகளை சாப்பிட பரிசீலிக்கவும்.",
-        'hi': "⚠️ इस भोजन का स्वास्थ्य स्कोर कम है। इसे स्वस्थ विकल्पों के साथ संतुलित करने या छोटे हिस्से खाने पर विचार करें।"
-    }
-    return warnings.get(language, warnings['en'])
+    return HEALTH_WARNING_MESSAGES.get(language, HEALTH_WARNING_MESSAGES['en'])
 
 def handle_start_command(sender: str, user: Optional[Dict]):
     """Handle start/welcome command"""
@@ -1955,7 +2472,7 @@ def handle_start_command(sender: str, user: Optional[Dict]):
             welcome_message = language_manager.get_message(user_language, 'welcome')
         else:
             # New user - start registration
-            welcome_message = language_manager.get_message('en', 'language_selection') + "\n\n" + language_manager.get_language_options_text()
+            welcome_message = language_manager.get_message_with_language_options('en', 'language_selection')
             # Start registration session with language step
             db_manager.update_registration_session(sender, 'language', {})
         
@@ -1984,35 +2501,37 @@ def handle_language_command(sender: str):
     except Exception as e:
         logger.error(f"Error handling language command: {e}")
 
+# Greetings that (re)start the conversation
+START_COMMANDS = frozenset({'start', 'hello', 'hi', 'hey'})
+
+# Language name -> code map, built once at import instead of on every message
+LANGUAGE_CODES = {
+    'english': 'en',
+    'tamil': 'ta',
+    'telugu': 'te',
+    'hindi': 'hi',
+    'kannada': 'kn',
+    'malayalam': 'ml',
+    'marathi': 'mr',
+    'gujarati': 'gu',
+    'bengali': 'bn'
+}
+
 def is_language_selection(text: str) -> bool:
-    """Check if text is a valid language selection"""
-    language_names = {
-        'english': 'en',
-        'tamil': 'ta', 
-        'telugu': 'te',
-        'hindi': 'hi',
-        'kannada': 'kn',
-        'malayalam': 'ml',
-        'marathi': 'mr',
-        'gujarati': 'gu',
-        'bengali': 'bn'
-    }
-    return text.lower() in language_names
+    """Check if text is a valid language selection (text is already stripped and lowercased)"""
+    return text in LANGUAGE_CODES
 
 def get_language_code(text: str) -> str:
-    """Get language code from text input"""
-    language_names = {
-        'english': 'en',
-        'tamil': 'ta',
-        'telugu': 'te', 
-        'hindi': 'hi',
-        'kannada': 'kn',
-        'malayalam': 'ml',
-        'marathi': 'mr',
-        'gujarati': 'gu',
-        'bengali': 'bn'
-    }
-    return language_names.get(text.lower(), 'en')
+    """Get language code from text input (text is already stripped and lowercased)"""
+    return LANGUAGE_CODES.get(text, 'en')
+
+# Normalized text -> command intent, so a message is classified with one dict lookup
+COMMAND_INTENTS = {
+    **{command: 'start' for command in START_COMMANDS},
+    'help': 'help',
+    'language': 'language',
+    **{name: 'language_selection' for name in LANGUAGE_CODES},
+}
 
 def handle_language_selection(sender: str, text: str, user: Optional[Dict]):
     """Handle language selection from user"""
@@ -2028,14 +2547,8 @@ def handle_language_selection(sender: str, text: str, user: Optional[Dict]):
             else:
                 confirmation_message = language_manager.get_message(user.get('preferred_language', 'en'), 'language_change_failed')
         else:
-            # Handle registration flow
-            session = db_manager.get_registration_session(sender)
-            if session:
-                temp_data = session.get('temp_data', {})
-                temp_data['language'] = language_code
-                
-                # Move to name step
-                db_manager.update_registration_session(sender, 'name', temp_data)
+            # Handle registration flow: move to name step, merging the language into the session in one statement
+            if db_manager.advance_registration_session(sender, 'name', {'language': language_code}):
                 confirmation_message = language_manager.get_message(language_code, 'ask_name')
             else:
                 confirmation_message = language_manager.get_message('en', 'no_registration_session')
@@ -2056,7 +2569,7 @@ def handle_registration_flow(sender: str, text: str):
                 handle_language_selection(sender, text, None)
             else:
                 # Start with language selection
-                welcome_message = language_manager.get_message('en', 'language_selection') + "\n\n" + language_manager.get_language_options_text()
+                welcome_message = language_manager.get_message_with_language_options('en', 'language_selection')
                 whatsapp_bot.send_message(sender, welcome_message)
                 db_manager.update_registration_session(sender, 'language', {})
             return
@@ -2069,19 +2582,19 @@ def handle_registration_flow(sender: str, text: str):
             if is_language_selection(text):
                 handle_language_selection(sender, text, None)
             else:
-                invalid_message = language_manager.get_message('en', 'invalid_language') + "\n\n" + language_manager.get_language_options_text()
+                invalid_message = language_manager.get_message_with_language_options('en', 'invalid_language')
                 whatsapp_bot.send_message(sender, invalid_message)
                 
         elif current_step == 'name':
             # Handle name input
-            if len(text.strip()) < 2:
+            if len(text) < 2:
                 selected_language = temp_data.get('language', 'en')
                 invalid_name_message = language_manager.get_message(selected_language, 'invalid_name')
                 whatsapp_bot.send_message(sender, invalid_name_message)
                 return
             
             # Save name and complete registration
-            temp_data['name'] = text.strip().title()
+            temp_data['name'] = text.title()
             selected_language = temp_data.get('language', 'en')
             
             # Create user
@@ -2092,7 +2605,10 @@ def handle_registration_flow(sender: str, text: str):
             )
             
             if success:
-                completion_message = language_manager.get_message(selected_language, 'registration_complete') + "\n\n" + language_manager.get_message(selected_language, 'welcome')
+                completion_message = "\n\n".join((
+                    language_manager.get_message(selected_language, 'registration_complete'),
+                    language_manager.get_message(selected_language, 'welcome')
+                ))
                 whatsapp_bot.send_message(sender, completion_message)
             else:
                 failed_message = language_manager.get_message(selected_language, 'registration_failed')
@@ -2111,10 +2627,12 @@ def handle_11za_webhook():
         if not data:
             return jsonify({'status': 'no_data'}), 400
         
-        logger.info(f"11za webhook received: {json.dumps(data)}")
+        # Full payload dumps are only worth their serialization cost when debugging
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("11za webhook received: %s", json.dumps(data))
         
-        # Process the 11za message
-        process_11za_message(data)
+        # Process the 11za message in the background so the webhook is acknowledged right away
+        enqueue_message(data.get('from'), process_11za_message, data)
         
         return jsonify({'status': 'success'}), 200
         
@@ -2129,7 +2647,7 @@ def process_11za_message(data: Dict[str, Any]):
         content = data.get("content", {})
         content_type = content.get("contentType")
         
-        logger.info(f"Processing {content_type} message from {sender}")
+        logger.info("Processing %s message from %s", content_type, sender)
         
         if content_type == "text":
             handle_11za_text_message(sender, content)
@@ -2148,40 +2666,33 @@ def process_11za_message(data: Dict[str, Any]):
 def handle_11za_text_message(sender: str, content: Dict[str, Any]):
     """Handle incoming text messages from 11za"""
     try:
+        # Normalized once here; every downstream handler relies on this form
         text_content = content.get("text", "").strip().lower()
         
-        logger.info(f"11za text message from {sender}: {text_content}")
+        logger.debug("11za text message from %s: %s", sender, text_content)
         
-        # ENHANCED DEBUGGING - Check if user exists
+        # Check if user exists
         user = db_manager.get_user_by_phone(sender)
-        
-        # Add detailed logging for debugging - FIXED
-        logger.info(f"DEBUG: User lookup for {sender}")
-        logger.info(f"DEBUG: User data: {safe_json_serialize(user) if user else 'None'}")
-        logger.info(f"DEBUG: User type: {type(user)}")
-        logger.info(f"DEBUG: User truthiness: {bool(user)}")
-        
-        # Check for registration session
-        session = db_manager.get_registration_session(sender)
-        logger.info(f"DEBUG: Registration session: {safe_json_serialize(session) if session else 'None'}")
+        logger.debug("User lookup for %s: %s", sender, user)
         
         # Handle different text commands
-        if text_content in ['start', 'hello', 'hi', 'hey']:
-            logger.info(f"DEBUG: Calling handle_11za_start_command with user: {user}")
+        command = COMMAND_INTENTS.get(text_content)
+        if command == 'start':
+            logger.debug("Calling handle_11za_start_command with user: %s", user)
             handle_11za_start_command(sender, user)
-        elif text_content == 'help':
+        elif command == 'help':
             handle_11za_help_command(sender, user)
-        elif text_content == 'language':
+        elif command == 'language':
             handle_11za_language_command(sender)
-        elif is_language_selection(text_content):
+        elif command == 'language_selection':
             handle_11za_language_selection(sender, text_content, user)
         elif not user:
             # User doesn't exist, start registration
-            logger.info(f"DEBUG: Starting registration flow for {sender}")
+            logger.debug("Starting registration flow for %s", sender)
             handle_11za_registration_flow(sender, text_content)
         else:
             # User exists but sent unrecognized text
-            logger.info(f"DEBUG: User exists, sending unknown command message")
+            logger.debug("User exists, sending unknown command message")
             user_language = user.get('preferred_language', 'en') if user else 'en'
             unknown_message = language_manager.get_message(user_language, 'unknown_command')
             elevenza_bot.send_messages(sender, unknown_message)
@@ -2197,7 +2708,7 @@ def handle_11za_media_message(sender: str, content: Dict[str, Any]):
         media_type = media_info.get("type")
         media_url = media_info.get("url")
         
-        logger.info(f"11za media message from {sender}, type: {media_type}, url: {media_url}")
+        logger.debug("11za media message from %s, type: %s, url: %s", sender, media_type, media_url)
         
         if media_type != "image":
             user = db_manager.get_user_by_phone(sender)
@@ -2210,7 +2721,7 @@ def handle_11za_media_message(sender: str, content: Dict[str, Any]):
         user = db_manager.get_user_by_phone(sender)
         if not user:
             # User doesn't exist, start registration with language
-            welcome_message = language_manager.get_message('en', 'language_selection') + "\n\n" + language_manager.get_language_options_text()
+            welcome_message = language_manager.get_message_with_language_options('en', 'language_selection')
             elevenza_bot.send_messages(sender, welcome_message)
             db_manager.update_registration_session(sender, 'language', {})
             return
@@ -2224,55 +2735,57 @@ def handle_11za_media_message(sender: str, content: Dict[str, Any]):
         
         user_language = user.get('preferred_language', 'en')
         
-        # Send analysis started message
+        # Send analysis started message while the image downloads
         analyzing_message = language_manager.get_message(user_language, 'analyzing')
-        elevenza_bot.send_messages(sender, analyzing_message)
+        analyzing_future = io_executor.submit(elevenza_bot.send_messages, sender, analyzing_message)
         
         # Download and process image
         try:
             # Download image from 11za
-            image_bytes = elevenza_bot.download_media(media_url)
+            try:
+                image_bytes = elevenza_bot.download_media(media_url)
+            finally:
+                # Keep the analyzing notice ahead of every later reply, including errors
+                analyzing_future.result()
             
             if not image_bytes:
                 error_message = language_manager.get_message(user_language, 'image_processing_error')
                 elevenza_bot.send_messages(sender, error_message)
                 return
             
-            # Upload to S3
-            image_url, file_location = s3_manager.upload_image(image_bytes, user['user_id'])
+            # Shrink once so S3 and Gemini both get the smaller payload
+            image_bytes = optimize_image(image_bytes)
+            
+            # Upload to S3 in the background while Gemini analyzes the same bytes
+            upload_future = io_executor.submit(s3_manager.upload_image, image_bytes, user['user_id'])
+            
+            # Analyze image - now returns formatted message and structured JSON
+            user_message, nutrition_json = analyzer.analyze_image_bytes(image_bytes, user_language)
+            
+            image_url, file_location = upload_future.result()
             
             if not image_url or not file_location:
                 error_message = language_manager.get_message(user_language, 'image_processing_error')
                 elevenza_bot.send_messages(sender, error_message)
                 return
             
-            # Convert bytes to PIL Image for analysis
-            image = Image.open(io.BytesIO(image_bytes))
-            
-            # Analyze image - now returns formatted message and structured JSON
-            user_message, nutrition_json = analyzer.analyze_image(image, user_language)
-            
             # Enhanced logging of structured data
             if nutrition_json:
                 dish_name = nutrition_json.get('dish_identification', {}).get('name', 'Unknown')
                 calories = nutrition_json.get('nutrition_facts', {}).get('calories', 0)
                 health_score = nutrition_json.get('health_analysis', {}).get('health_score', 0)
-                logger.info(f"Analyzed: {dish_name}, Calories: {calories}, Health Score: {health_score}")
+                logger.info("Analyzed: %s, Calories: %s, Health Score: %s", dish_name, calories, health_score)
             
-            # Save analysis with comprehensive nutrient details
-            success = db_manager.save_nutrition_analysis(
+            # Save analysis with comprehensive nutrient details; the reply doesn't wait on the INSERT
+            db_manager.queue_nutrition_analysis(
                 user_id=user['user_id'],
                 file_location=file_location,
                 analysis_result=user_message,
                 language=user_language,
-                nutrition_data=nutrition_json
+                nutrition_data=nutrition_json,
+                image_url=image_url
             )
             
-            if not success:
-                logger.error(f"Failed to save nutrition analysis for user {user['user_id']}")
-            else:
-                logger.info(f"Successfully saved nutrition analysis for user {user['user_id']}")
-            
             # Send the formatted analysis result to user
             elevenza_bot.send_messages(sender, user_message)
             
@@ -2297,27 +2810,24 @@ def handle_11za_media_message(sender: str, content: Dict[str, Any]):
 def handle_11za_start_command(sender: str, user: Optional[Dict]):
     """Handle start/welcome command for 11za"""
     try:
-        logger.info(f"DEBUG: handle_11za_start_command called")
-        logger.info(f"DEBUG: sender: {sender}")
-        logger.info(f"DEBUG: user: {safe_json_serialize(user) if user else 'None'}")  # FIXED
-        logger.info(f"DEBUG: user evaluation: {bool(user)}")
+        logger.debug("handle_11za_start_command called for %s with user: %s", sender, user)
         
         if user:
             # Existing user
-            logger.info(f"DEBUG: Treating as existing user")
+            logger.debug("Treating as existing user")
             user_language = user.get('preferred_language', 'en')
-            logger.info(f"DEBUG: User language: {user_language}")
+            logger.debug("User language: %s", user_language)
             welcome_message = language_manager.get_message(user_language, 'welcome')
-            logger.info(f"DEBUG: Welcome message: {welcome_message}")
+            logger.debug("Welcome message: %s", welcome_message)
         else:
             # New user - start registration
-            logger.info(f"DEBUG: Treating as new user - starting registration")
-            welcome_message = language_manager.get_message('en', 'language_selection') + "\n\n" + language_manager.get_language_options_text()
+            logger.debug("Treating as new user - starting registration")
+            welcome_message = language_manager.get_message_with_language_options('en', 'language_selection')
             # Start registration session with language step
             db_manager.update_registration_session(sender, 'language', {})
-            logger.info(f"DEBUG: Registration session created")
+            logger.debug("Registration session created")
         
-        logger.info(f"DEBUG: Sending message via elevenza_bot: {welcome_message}")
+        logger.debug("Sending message via elevenza_bot: %s", welcome_message)
         elevenza_bot.send_messages(sender, welcome_message)
         
     except Exception as e:
@@ -2357,14 +2867,8 @@ def handle_11za_language_selection(sender: str, text: str, user: Optional[Dict])
             else:
                 confirmation_message = language_manager.get_message(user.get('preferred_language', 'en'), 'language_change_failed')
         else:
-            # Handle registration flow
-            session = db_manager.get_registration_session(sender)
-            if session:
-                temp_data = session.get('temp_data', {})
-                temp_data['language'] = language_code
-                
-                # Move to name step
-                db_manager.update_registration_session(sender, 'name', temp_data)
+            # Handle registration flow: move to name step, merging the language into the session in one statement
+            if db_manager.advance_registration_session(sender, 'name', {'language': language_code}):
                 confirmation_message = language_manager.get_message(language_code, 'ask_name')
             else:
                 confirmation_message = language_manager.get_message('en', 'no_registration_session')
@@ -2385,7 +2889,7 @@ def handle_11za_registration_flow(sender: str, text: str):
                 handle_11za_language_selection(sender, text, None)
             else:
                 # Start with language selection
-                welcome_message = language_manager.get_message('en', 'language_selection') + "\n\n" + language_manager.get_language_options_text()
+                welcome_message = language_manager.get_message_with_language_options('en', 'language_selection')
                 elevenza_bot.send_messages(sender, welcome_message)
                 db_manager.update_registration_session(sender, 'language', {})
             return
@@ -2398,19 +2902,19 @@ def handle_11za_registration_flow(sender: str, text: str):
             if is_language_selection(text):
                 handle_11za_language_selection(sender, text, None)
             else:
-                invalid_message = language_manager.get_message('en', 'invalid_language') + "\n\n" + language_manager.get_language_options_text()
+                invalid_message = language_manager.get_message_with_language_options('en', 'invalid_language')
                 elevenza_bot.send_messages(sender, invalid_message)
                 
         elif current_step == 'name':
             # Handle name input
-            if len(text.strip()) < 2:
+            if len(text) < 2:
                 selected_language = temp_data.get('language', 'en')
                 invalid_name_message = language_manager.get_message(selected_language, 'invalid_name')
                 elevenza_bot.send_messages(sender, invalid_name_message)
                 return
             
             # Save name and complete registration
-            temp_data['name'] = text.strip().title()
+            temp_data['name'] = text.title()
             selected_language = temp_data.get('language', 'en')
             
             # Create user
@@ -2421,7 +2925,10 @@ def handle_11za_registration_flow(sender: str, text: str):
             )
             
             if success:
-                completion_message = language_manager.get_message(selected_language, 'registration_complete') + "\n\n" + language_manager.get_message(selected_language, 'welcome')
+                completion_message = "\n\n".join((
+                    language_manager.get_message(selected_language, 'registration_complete'),
+                    language_manager.get_message(selected_language, 'welcome')
+                ))
                 elevenza_bot.send_messages(sender, completion_message)
             else:
                 failed_message = language_manager.get_message(selected_language, 'registration_failed')
@@ -2435,10 +2942,13 @@ def lambda_handler(event, context):
     """AWS Lambda handler for 11za webhook"""
     try:
         body = json.loads(event["body"])
-        logger.info(f"Lambda received: {json.dumps(body)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Lambda received: %s", json.dumps(body))
         
         # Process the 11za message using existing infrastructure
         process_11za_message(body)
+        # The runtime may freeze once we return, so write buffered analyses first
+        db_manager.flush_nutrition_analyses()
         
         return {
             "statusCode": 200,
@@ -2467,12 +2977,7 @@ def health_check():
     
     # Check database connectivity
     try:
-        conn = db_manager.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1")
-        cursor.fetchone()
-        cursor.close()
-        conn.close()
+        db_manager.ping()
         health_status['components']['database'] = {
             'status': 'healthy',
             'message': 'Database connection successful'
@@ -2500,8 +3005,9 @@ def health_check():
     
     # Check Gemini API (basic configuration check)
     try:
-        # Just check if the model is configured, don't make actual API call
-        model = genai.GenerativeModel('gemini-1.5-flash')
+        # Just check the analyzer's model is configured, don't make actual API call
+        if analyzer.model is None:
+            raise Exception("Gemini model not initialized")
         health_status['components']['gemini'] = {
             'status': 'healthy',
             'message': 'Gemini API configured'
@@ -2571,44 +3077,9 @@ def health_check():
 def admin_stats():
     """Admin endpoint for system statistics"""
     try:
-        conn = db_manager.get_connection()
-        cursor = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Get user statistics
-        cursor.execute("SELECT COUNT(*) as total_users FROM users WHERE registration_status = 'completed'")
-        total_users = cursor.fetchone()['total_users']
-        
-        cursor.execute("SELECT COUNT(*) as total_analyses FROM nutrition_analysis")
-        total_analyses = cursor.fetchone()['total_analyses']
-        
-        cursor.execute("""
-            SELECT DATE(created_at) as date, COUNT(*) as count 
-            FROM nutrition_analysis 
-            WHERE created_at >= NOW() - INTERVAL '7 days'
-            GROUP BY DATE(created_at)
-            ORDER BY date DESC
-        """)
-        recent_activity = cursor.fetchall()
-        
-        cursor.execute("""
-            SELECT preferred_language, COUNT(*) as count
-            FROM users 
-            WHERE registration_status = 'completed'
-            GROUP BY preferred_language
-            ORDER BY count DESC
-        """)
-        language_stats = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
-        
-        return jsonify({
-            'total_users': total_users,
-            'total_analyses': total_analyses,
-            'recent_activity': [dict(row) for row in recent_activity],
-            'language_distribution': [dict(row) for row in language_stats],
-            'timestamp': datetime.now().isoformat()
-        })
+        stats_json = db_manager.get_admin_stats_json()
+        
+        return Response(stats_json, mimetype='application/json')
         
     except Exception as e:
         logger.error(f"Error getting admin stats: {e}")
@@ -2636,11 +3107,15 @@ def update_messages():
         success = db_manager.insert_language_messages(data)
         
         if success:
-            # Reinitialize language manager to pick up new messages
-            global language_manager
-            language_manager = LanguageManager(db_manager)
-            
-            return jsonify({'status': 'success', 'message': 'Messages updated successfully'}), 200
+            # Apply the new messages in place in this worker; the analyzer holds the same manager.
+            # Other workers see the changed rows on their next refresh check (MESSAGES_REFRESH_SECONDS).
+            language_manager.update_messages(data)
+            
+            return jsonify({
+                'status': 'success',
+                'message': 'Messages updated successfully',
+                'refresh_seconds': MESSAGES_REFRESH_SECONDS
+            }), 200
         else:
             return jsonify({'error': 'Failed to update messages'}), 500
             
@@ -2648,6 +3123,19 @@ def update_messages():
         logger.error(f"Error updating messages: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/admin/messages/reload', methods=['POST'])
+def reload_messages():
+    """Admin endpoint to reload language messages from the database in this worker"""
+    try:
+        if language_manager.reload_messages():
+            return jsonify({'status': 'success', 'message': 'Messages reloaded successfully'}), 200
+        else:
+            return jsonify({'error': 'Failed to reload messages'}), 500
+            
+    except Exception as e:
+        logger.error(f"Error reloading messages: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/admin/messages', methods=['GET'])
 def get_messages():
     """Admin endpoint to get all language messages"""
@@ -2669,6 +3157,13 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
+    # One-shot schema migration: `python bot.py migrate`
+    if len(sys.argv) > 1 and sys.argv[1] == 'migrate':
+        db_manager.init_database()
+        language_manager.initialize_messages()
+        logger.info("Migration completed")
+        sys.exit(0)
+    
     # Perform startup cleanup
     try:
         db_manager.cleanup_old_registration_sessions()
@@ -0,0 +1,28 @@
+# Gunicorn configuration for the nutrition bot
+# Usage: gunicorn -c gunicorn.conf.py bot:app
+import multiprocessing
+import os
+
+# Webhook handlers spend most of their time waiting on Gemini, S3, Postgres and
+# the WhatsApp API, so gevent workers multiplex many of them per process.
+# This relies on every one of those clients using patchable sockets: Gemini is
+# configured with the REST transport in bot.py (gRPC would block the hub) and
+# psycopg2 is made cooperative in post_fork below.
+# Patch before the app is preloaded so its sockets and locks are cooperative.
+from gevent import monkey
+monkey.patch_all()
+
+# Platform-provided settings (PORT, WEB_CONCURRENCY) take precedence over the defaults
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+worker_class = 'gevent'
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 60))
+preload_app = True
+
+
+def post_fork(server, worker):
+    """Make psycopg2 yield to other greenlets while waiting on the database"""
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+    server.log.info(f"Patched psycopg2 for gevent in worker {worker.pid}")
@@ -0,0 +1,42 @@
+import io
+import os
+import sys
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# bot.py validates its environment and connects its managers on import
+try:
+    import bot
+except Exception as e:  # pragma: no cover - depends on the deployment environment
+    pytest.skip(f"bot could not be imported: {e}", allow_module_level=True)
+
+
+BODY = os.urandom(3 * bot.MEDIA_CHUNK_SIZE + 123)
+
+
+def make_response(body: bytes, content_length=None) -> requests.Response:
+    """Build a streamed response whose body is read from an in-memory raw stream"""
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(body)
+    if content_length is not None:
+        response.headers['Content-Length'] = str(content_length)
+    return response
+
+
+def read(response) -> bytes:
+    data = bot.read_streamed_content(response)
+    assert isinstance(data, bytes)
+    return data
+
+
+def test_read_streamed_content_matching_content_length():
+    assert read(make_response(BODY, len(BODY))) == BODY
+
+
+def test_read_streamed_content_wrong_content_length():
+    for content_length in (None, 0, len(BODY) // 2, len(BODY) * 2):
+        assert read(make_response(BODY, content_length)) == BODY